@@ -1,67 +1,119 @@
+import io
 import os
 import logging
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, flash, session
-import tempfile
-import json
+import time
+from flask import (Flask, Request, Response, render_template, request, jsonify, redirect, url_for, flash, session,
+                   stream_with_context, g, before_render_template, template_rendered)
+from datetime import timedelta
 from werkzeug.utils import secure_filename
-from parser import analyze_file, PythonParser, ShellParser
+from parser import analyze_file
+from scanner import allowed_file, analyze_sources, decode_source
+from cache import (DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES, DEFAULT_RESULT_CACHE_BYTES, DEFAULT_RESULT_CACHE_ENTRIES,
+                   ResultCache, content_digest, with_filename)
+from models import db, ScanJob, fail_interrupted_jobs, get_scan, iter_scan_results, scan_folders, scan_files_page
+from jobs import scan_folder, store_scan, submit_scan_job, job_status
+from search import SEARCH_KINDS, SEARCH_MODES, search_scan
+from export import EXPORT_FORMATS, iter_export, iter_ndjson
+from archives import ArchiveError, ZIP_CONTENT_TYPES, TAR_CONTENT_TYPES, iter_archive_members
+from offload import AnalysisPool, Overloaded
+import metrics
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 
+class InMemoryRequest(Request):
+    """Request that keeps uploaded files in memory instead of spooling large ones to disk
+
+    MAX_CONTENT_LENGTH bounds the size of a whole request, uploads included.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
 # Create Flask app
 app = Flask(__name__)
+app.request_class = InMemoryRequest
 app.secret_key = os.environ.get("SESSION_SECRET", "dev_secret_key")
 
+# Analysis results are stored server-side; the session only carries the scan ID
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///pytable_analyzer.db')
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_recycle': 300, 'pool_pre_ping': True}
+app.config['SCAN_RETENTION'] = timedelta(hours=int(os.environ.get('SCAN_RETENTION_HOURS', 24)))
+app.config['MAX_STORED_SCANS'] = int(os.environ.get('MAX_STORED_SCANS', 100))
+db.init_app(app)
+
+with app.app_context():
+    db.create_all()
+    # Jobs left queued or running by a previous process never finish
+    fail_interrupted_jobs(app.config['SCAN_RETENTION'])
+
 # Configure upload settings
-UPLOAD_FOLDER = tempfile.mkdtemp()
-ALLOWED_EXTENSIONS = {'py', 'sh', 'bash'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
+app.config['MAX_ARCHIVE_MEMBER_SIZE'] = 16 * 1024 * 1024  # Uncompressed size limit per archive member
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+# Folder scans and large uploads run in a process pool; SCAN_WORKERS=1 scans in-process
+app.config['SCAN_WORKERS'] = int(os.environ.get('SCAN_WORKERS', os.cpu_count() or 1))
 
-def scan_directory(directory_path):
-    """Recursively scan directory for Python and Shell files"""
-    results = {}
-    
-    try:
-        # Check if directory exists
-        if not os.path.isdir(directory_path):
-            return {"error": f"Directory not found: {directory_path}"}, None
-        
-        file_count = 0
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                if allowed_file(file):
-                    file_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(file_path, directory_path)
-                    
-                    try:
-                        with open(file_path, 'r') as f:
-                            content = f.read()
-                        
-                        file_type = file.split('.')[-1]
-                        result = analyze_file(rel_path, content, file_type)
-                        
-                        # Store the folder path for organization
-                        result['folder_path'] = os.path.dirname(rel_path)
-                        results[rel_path] = result
-                        file_count += 1
-                    except Exception as e:
-                        logging.error(f"Error processing file {file_path}: {str(e)}")
-                        results[rel_path] = {
-                            "filename": rel_path,
-                            "error": f"Error reading file: {str(e)}",
-                            "tables": {},
-                            "folder_path": os.path.dirname(rel_path)
-                        }
-        
-        return results, file_count
-    except Exception as e:
-        logging.error(f"Error scanning directory {directory_path}: {str(e)}")
-        return {"error": f"Error scanning directory: {str(e)}"}, 0
+# Folder scans skip files above this size (0 = no limit); SCAN_GITIGNORE=0 also walks ignored paths
+app.config['SCAN_MAX_FILE_SIZE'] = int(os.environ.get('SCAN_MAX_FILE_SIZE', 0))
+app.config['SCAN_GITIGNORE'] = os.environ.get('SCAN_GITIGNORE', '1') == '1'
+
+# Parse results are cached on disk between folder scans; an empty PARSE_CACHE_PATH disables it
+app.config['PARSE_CACHE_PATH'] = os.environ.get('PARSE_CACHE_PATH', DEFAULT_CACHE_PATH)
+app.config['PARSE_CACHE_MAX_BYTES'] = int(os.environ.get('PARSE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+# With API_WORKERS above zero /api/analyze parses in a pool of that many processes, admitting at
+# most API_MAX_PENDING requests beyond them and answering 503 to the rest; serve it threaded
+app.config['API_WORKERS'] = int(os.environ.get('API_WORKERS', 0))
+app.config['API_MAX_PENDING'] = int(os.environ.get('API_MAX_PENDING', 32))
+api_pool = (AnalysisPool(app.config['API_WORKERS'], app.config['API_MAX_PENDING'])
+            if app.config['API_WORKERS'] > 0 else None)
+
+# Results of /api/analyze are kept in memory for repeated content; RESULT_CACHE_ENTRIES=0 disables
+# it and RESULT_CACHE_TTL (seconds, 0 = none) bounds how long an entry is reused
+app.config['RESULT_CACHE_ENTRIES'] = int(os.environ.get('RESULT_CACHE_ENTRIES', DEFAULT_RESULT_CACHE_ENTRIES))
+app.config['RESULT_CACHE_MAX_BYTES'] = int(os.environ.get('RESULT_CACHE_MAX_BYTES', DEFAULT_RESULT_CACHE_BYTES))
+app.config['RESULT_CACHE_TTL'] = float(os.environ.get('RESULT_CACHE_TTL', 0))
+result_cache = (ResultCache(app.config['RESULT_CACHE_ENTRIES'], app.config['RESULT_CACHE_MAX_BYTES'],
+                            app.config['RESULT_CACHE_TTL'] or None)
+                if app.config['RESULT_CACHE_ENTRIES'] > 0 else None)
+
+# Background folder scans run on an in-process thread pool of this size
+app.config['SCAN_JOB_WORKERS'] = int(os.environ.get('SCAN_JOB_WORKERS', 2))
+
+# Per-phase timings feed /metrics; SCAN_TIMINGS also stores them on every folder scan result
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') == '1'
+app.config['SCAN_TIMINGS'] = os.environ.get('SCAN_TIMINGS', '0') == '1'
+metrics.enable(app.config['METRICS_ENABLED'])
+
+@before_render_template.connect_via(app)
+def _start_render_timer(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def _record_render_time(sender, template, context, **extra):
+    started = g.pop('render_started', None)
+    if started is not None:
+        metrics.observe_phase('render', time.perf_counter() - started)
+
+def _analyze(filename, content, file_type, size=None, timings=False, pool=None):
+    """analyze_file with metrics recording, optionally attaching per-phase timings to the result
+
+    With a ``pool`` the file is parsed in one of its processes, which may
+    raise Overloaded.
+    """
+    if pool is not None:
+        result, timer = pool.analyze(filename, content, file_type, timings or metrics.is_enabled())
+    else:
+        timer = metrics.new_timer(timings)
+        result = analyze_file(filename, content, file_type, timer)
+    timer.add_bytes(len(content) if size is None else size)
+    metrics.record_file(result, timer)
+    if timings:
+        result['timings'] = timer.as_ms()
+    return result
+
+def _timings_requested():
+    return request.args.get('timings') == '1'
 
 @app.route('/')
 def index():
@@ -74,7 +126,13 @@ def analyze():
     # Handle folder path input (new option)
     if 'folder_path' in request.form and request.form['folder_path'].strip():
         folder_path = request.form['folder_path'].strip()
-        results, file_count = scan_directory(folder_path)
+        
+        # Large trees can be scanned in the background while the browser polls for progress
+        if request.form.get('background') == '1':
+            job = submit_scan_job(app, folder_path)
+            return redirect(url_for('show_job', job_id=job.id))
+        
+        results, file_count = scan_folder(app, folder_path)
         
         if isinstance(results, dict) and 'error' in results:
             flash(results['error'], 'danger')
@@ -92,10 +150,10 @@ def analyze():
             # Handle direct code input
             source_code = request.form['source']
             filename = request.form.get('filename', 'input_code.py')
-            file_type = filename.split('.')[-1] if '.' in filename else 'py'
+            file_type = _file_type_of(filename)
             
             filename = filename or 'input_code.py'  # Ensure filename is not None
-            result = analyze_file(filename, source_code, file_type)
+            result = _analyze(filename, source_code, file_type)
             result['folder_path'] = ''  # No folder for direct input
             results = {
                 filename: result
@@ -111,82 +169,250 @@ def analyze():
             flash('No files selected', 'danger')
             return redirect(url_for('index'))
             
+        # Uploads are analyzed straight from memory, in parallel when there are many
+        sources = []
         for file in files:
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                
-                try:
-                    with open(filepath, 'r') as f:
-                        content = f.read()
-                    
-                    file_type = filename.split('.')[-1]
-                    result = analyze_file(filename, content, file_type)
-                    result['folder_path'] = ''  # No folder for uploaded files
-                    results[filename] = result
-                except Exception as e:
-                    logging.error(f"Error processing uploaded file {filename}: {str(e)}")
-                    results[filename] = {
-                        "filename": filename,
-                        "error": f"Error reading file: {str(e)}",
-                        "tables": {},
-                        "folder_path": ""
-                    }
-                finally:
-                    # Clean up
-                    os.remove(filepath)
+                sources.append((secure_filename(file.filename), file.read()))
             else:
                 flash(f'File {file.filename} is not a supported type', 'warning')
+        
+        for result in analyze_sources(sources, app.config['SCAN_WORKERS']):
+            result['folder_path'] = ''  # No folder for uploaded files
+            results[result['filename']] = result
     
-    # Store results in session for download later
-    session['analysis_results'] = results
+    # Store results server-side and keep only the scan ID in the session
+    scan = store_scan(app, results)
+    session['scan_id'] = scan.id
     
-    # Group results by folder for the template
-    folder_structure = {}
-    if isinstance(results, dict):
-        for filename, result in results.items():
-            if isinstance(result, dict) and 'folder_path' in result:
-                folder = result['folder_path']
-            else:
-                folder = ''
-                
-            if folder not in folder_structure:
-                folder_structure[folder] = {}
-            folder_structure[folder][filename] = result
+    return redirect(url_for('show_results', scan_id=scan.id))
+
+@app.route('/results/<scan_id>')
+def show_results(scan_id):
+    scan = get_scan(scan_id)
+    if scan is None:
+        flash('Analysis results not found or expired', 'danger')
+        return redirect(url_for('index'))
     
-    return render_template('results.html', results=results, folder_structure=folder_structure)
+    # Only the folder skeleton is rendered; files are fetched per folder from the API
+    folders = scan_folders(scan.id)
+    return render_template('results.html', scan=scan, folders=folders)
+
+@app.route('/api/scans/<scan_id>/files')
+def api_scan_files(scan_id):
+    """Paginated results of the files in one folder of a scan"""
+    scan = get_scan(scan_id)
+    if scan is None:
+        return jsonify({'error': 'Scan not found'}), 404
+    
+    folder = request.args.get('folder', '')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 25, type=int), 1), 200)
+    total, files = scan_files_page(scan.id, folder, page, per_page)
+    
+    return jsonify({
+        'scan_id': scan.id,
+        'folder': folder,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'has_more': page * per_page < total,
+        'files': [{'path': path, 'result': result} for path, result in files]
+    })
+
+@app.route('/api/search')
+def api_search():
+    """Indexed search over the table, variable and field names, field types and paths of a scan"""
+    scan = get_scan(request.args.get('scan'))
+    if scan is None:
+        return jsonify({'error': 'Scan not found'}), 404
+    
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({'error': 'No search query provided'}), 400
+    
+    mode = request.args.get('mode', 'substring')
+    kind = request.args.get('kind') or None
+    if mode not in SEARCH_MODES or (kind and kind not in SEARCH_KINDS):
+        return jsonify({'error': 'Unsupported search mode or kind'}), 400
+    
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+    return jsonify(search_scan(scan.id, query, mode, kind, page, per_page))
 
 @app.route('/download_results')
 def download_results():
-    if 'analysis_results' not in session:
+    scan = get_scan(request.args.get('scan') or session.get('scan_id'))
+    if scan is None:
         flash('No analysis results found', 'danger')
         return redirect(url_for('index'))
     
-    # Create a temporary file to store the JSON results
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.json')
-    with open(temp_file.name, 'w') as f:
-        json.dump(session['analysis_results'], f, indent=2)
+    # Stream the export file by file instead of building the document in memory
+    fmt = request.args.get('format', 'json')
+    if fmt not in EXPORT_FORMATS:
+        flash(f'Unsupported download format: {fmt}', 'danger')
+        return redirect(url_for('show_results', scan_id=scan.id))
+    compress = request.args.get('gzip') == '1'
+    
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    download_name = f'pytable_analysis{extension}'
+    if compress:
+        mimetype = 'application/gzip'
+        download_name += '.gz'
     
-    return send_file(
-        temp_file.name,
-        as_attachment=True,
-        download_name='pytable_analysis.json',
-        mimetype='application/json'
+    chunks = iter_export(iter_scan_results(scan.id), fmt, compress)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={download_name}'}
     )
 
+@app.route('/jobs/<job_id>')
+def show_job(job_id):
+    job = db.session.get(ScanJob, job_id)
+    if job is None:
+        flash('Scan job not found or expired', 'danger')
+        return redirect(url_for('index'))
+    
+    return render_template('job.html', job=job_status(job))
+
+@app.route('/api/jobs/<job_id>')
+def api_job(job_id):
+    """Progress of a background folder scan"""
+    job = db.session.get(ScanJob, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job_status(job))
+
 @app.route('/api/analyze', methods=['POST'])
 def api_analyze():
     """API endpoint for analyzing code"""
     if request.json:
         content = request.json.get('content', '')
         filename = request.json.get('filename', 'input.py')
-        file_type = filename.split('.')[-1] if '.' in filename else 'py'
-        
-        result = analyze_file(filename, content, file_type)
-        return jsonify(result)
+        # Checked before the content is hashed for the result cache
+        if not isinstance(content, str) or not isinstance(filename, str):
+            return jsonify({'error': "'content' and 'filename' must be strings"}), 400
+        file_type = _file_type_of(filename)
+        timings = _timings_requested()
+
+        # Timed results differ on every call, so they are neither cached nor tagged
+        digest = etag = cached = None
+        if result_cache is not None and not timings:
+            digest = content_digest(content.encode('utf-8', 'surrogatepass'))
+            etag = result_cache.etag(digest, file_type, filename)
+            if request.if_none_match.contains(etag):
+                result_cache.count_not_modified()
+                _count_result_cache('not_modified')
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+            cached = result_cache.get(digest, file_type)
+            _count_result_cache('hit' if cached is not None else 'miss')
+
+        if cached is not None:
+            result = with_filename(cached, filename)
+            metrics.record_file(result)
+        else:
+            try:
+                result = _analyze(filename, content, file_type, timings=timings, pool=api_pool)
+            except Overloaded as e:
+                if metrics.is_enabled():
+                    metrics.API_REJECTED.inc()
+                response = jsonify({'error': str(e)})
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response, 503
+            if digest is not None and 'error' not in result:
+                result_cache.put(digest, file_type, result)
+
+        response = jsonify(result)
+        # Error results are not cached, so clients never hold a tag for one
+        if etag is not None and 'error' not in result:
+            response.set_etag(etag)
+        return response
     else:
         return jsonify({'error': 'No content provided'}), 400
 
+def _count_result_cache(outcome):
+    if metrics.is_enabled():
+        metrics.RESULT_CACHE_REQUESTS.inc(outcome=outcome)
+
+@app.route('/api/analyze/cache')
+def api_result_cache_stats():
+    """Hit rate and size of the in-memory result cache of /api/analyze"""
+    if result_cache is None:
+        return jsonify({'enabled': False})
+    stats = result_cache.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+def _file_type_of(filename):
+    """The file type analyze_file gets for a filename; names without an extension are Python"""
+    return filename.split('.')[-1] if '.' in filename else 'py'
+
+def _analyze_archive_members(members, timings=False):
+    """Analyze (name, data, error) archive members as they are read"""
+    for name, data, error in members:
+        if error is None:
+            try:
+                result = _analyze(name, decode_source(data), _file_type_of(name), len(data), timings)
+            except Exception as e:
+                logging.error(f"Error processing archive member {name}: {str(e)}")
+                error = f"Error reading file: {str(e)}"
+        if error is not None:
+            result = {'filename': name, 'error': error, 'tables': {}}
+        yield name, result
+
+def _analyze_json_files(files, timings=False):
+    """Analyze the {filename, content} objects of a batch request in order"""
+    for index, item in enumerate(files):
+        if not isinstance(item, dict) or not isinstance(item.get('content'), str):
+            name = f'#{index}'
+            yield name, {'filename': name, 'error': 'Each file needs a string content', 'tables': {}}
+            continue
+        if not isinstance(item.get('filename') or '', str):
+            name = f'#{index}'
+            yield name, {'filename': name, 'error': 'A filename must be a string', 'tables': {}}
+            continue
+        filename = item.get('filename') or 'input.py'
+        yield filename, _analyze(filename, item['content'], _file_type_of(filename), timings=timings)
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def api_analyze_batch():
+    """Analyze many files in one request and stream the results back as NDJSON
+
+    Accepts a JSON array of {"filename", "content"} objects, a zip or tar
+    archive uploaded as the 'archive' form field, or a raw archive body.
+    """
+    max_member_size = app.config['MAX_ARCHIVE_MEMBER_SIZE']
+    timings = _timings_requested()
+    try:
+        if request.mimetype == 'application/json':
+            files = request.get_json(silent=True)
+            if not isinstance(files, list):
+                return jsonify({'error': 'Expected a JSON array of files'}), 400
+            items = _analyze_json_files(files, timings)
+        elif 'archive' in request.files:
+            # Uploaded files are closed when the view returns, before the response is streamed
+            archive = io.BytesIO(request.files['archive'].read())
+            members = iter_archive_members(archive, max_member_size=max_member_size)
+            items = _analyze_archive_members(members, timings)
+        elif request.mimetype in ZIP_CONTENT_TYPES or request.mimetype in TAR_CONTENT_TYPES:
+            kind = 'zip' if request.mimetype in ZIP_CONTENT_TYPES else 'tar'
+            members = iter_archive_members(request.stream, kind, max_member_size)
+            items = _analyze_archive_members(members, timings)
+        else:
+            return jsonify({'error': 'No files or archive provided'}), 400
+    except ArchiveError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return Response(stream_with_context(iter_ndjson(items)), mimetype='application/x-ndjson')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Counters and phase latency histograms of this process in the Prometheus text format"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,103 @@
+import io
+import tarfile
+import zipfile
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from scanner import allowed_file
+
+# Content types accepted as raw archive request bodies
+ZIP_CONTENT_TYPES = {'application/zip', 'application/x-zip-compressed'}
+TAR_CONTENT_TYPES = {'application/x-tar', 'application/gzip', 'application/x-gzip',
+                     'application/x-gtar', 'application/x-bzip2', 'application/x-xz'}
+
+# Name reported for errors of the archive as a whole, once members are being read
+ARCHIVE_NAME = '<archive>'
+
+class ArchiveError(Exception):
+    """The upload is not a readable zip or tar archive"""
+
+def iter_archive_members(stream: BinaryIO, kind: Optional[str] = None,
+                         max_member_size: Optional[int] = None) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    """Yield (name, data, error) for each supported file in a zip or tar archive
+
+    Members are read into memory one at a time and never written to disk.
+    ``kind`` is 'zip' or 'tar'; when omitted the stream must be seekable so
+    the format can be sniffed.  A tar stream that is not seekable is read
+    sequentially.  Members larger than ``max_member_size`` or that cannot be
+    read (bad CRC, unsupported compression, truncated data) are reported with
+    an error instead of their data, since the caller may already be
+    streaming results.  A tar stream that breaks off ends with an error for
+    ARCHIVE_NAME.
+    """
+    if kind is None:
+        kind = 'zip' if zipfile.is_zipfile(stream) else 'tar'
+        stream.seek(0)
+
+    if kind == 'zip':
+        return _iter_zip(stream, max_member_size)
+    return _iter_tar(stream, max_member_size)
+
+def _too_large(size: int, max_member_size: Optional[int]) -> Optional[str]:
+    if max_member_size is not None and size > max_member_size:
+        return f"File too large: {size} bytes (limit {max_member_size})"
+    return None
+
+def _iter_zip(stream: BinaryIO, max_member_size: Optional[int]):
+    if not stream.seekable():
+        # The zip directory sits at the end of the file; the upload is bounded by MAX_CONTENT_LENGTH
+        stream = io.BytesIO(stream.read())
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile as e:
+        raise ArchiveError(f"Invalid zip archive: {str(e)}")
+
+    def members():
+        with archive:
+            for info in archive.infolist():
+                if info.is_dir() or not allowed_file(info.filename):
+                    continue
+                error = _too_large(info.file_size, max_member_size)
+                if error:
+                    yield info.filename, None, error
+                    continue
+                try:
+                    with archive.open(info) as member:
+                        data = member.read()
+                except Exception as e:
+                    yield info.filename, None, f"Error reading archive member: {str(e)}"
+                    continue
+                yield info.filename, data, None
+    return members()
+
+def _iter_tar(stream: BinaryIO, max_member_size: Optional[int]):
+    mode = 'r:*' if stream.seekable() else 'r|*'
+    try:
+        archive = tarfile.open(fileobj=stream, mode=mode)
+    except tarfile.TarError as e:
+        raise ArchiveError(f"Invalid tar archive: {str(e)}")
+
+    def members():
+        with archive:
+            infos = iter(archive)
+            while True:
+                try:
+                    info = next(infos)
+                except StopIteration:
+                    return
+                except Exception as e:
+                    # Nothing after a truncated or corrupt header can be read
+                    yield ARCHIVE_NAME, None, f"Invalid tar archive: {str(e)}"
+                    return
+                if not info.isfile() or not allowed_file(info.name):
+                    continue
+                error = _too_large(info.size, max_member_size)
+                if error:
+                    yield info.name, None, error
+                    continue
+                try:
+                    data = archive.extractfile(info).read()
+                except Exception as e:
+                    yield info.name, None, f"Error reading archive member: {str(e)}"
+                    continue
+                yield info.name, data, None
+    return members()
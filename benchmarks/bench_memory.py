@@ -0,0 +1,102 @@
+"""Peak memory benchmark for a large synthetic folder scan.
+
+Writes a tree of PyTables modules and shell scripts with embedded Python
+blocks, then scans it in a fresh child process and reports that process's
+peak resident set size.  Run it on two revisions to compare them.  With
+--sink ndjson the results stream to /dev/null instead of being collected,
+and peak memory should not grow with --files.
+
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --files 4000 --fields-per-description 300 --workers 4
+    python benchmarks/bench_memory.py --files 20000 --sink ndjson
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from corpus import add_spec_arguments, spec_from_args, write_corpus  # noqa: E402
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss survives exec, so it would include the parent's peak while it
+    # generated the corpus; VmHWM belongs to this process image only
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(directory: str, workers: int, sink: str) -> None:
+    """Scan ``directory`` and print the measurements as JSON"""
+    from scanner import iter_scan
+
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    if sink == 'dict':
+        from scanner import scan_directory
+
+        results, file_count = scan_directory(directory, workers=workers)
+        fields = sum(len(table['fields']) for result in results.values() for table in result['tables'].values())
+    else:
+        from sinks import NDJSONSink
+
+        output = NDJSONSink(os.devnull)
+        file_count = fields = 0
+        for position, rel_path, result, success in iter_scan(directory, workers=workers):
+            output.write(position, rel_path, result)
+            file_count += success
+            fields += sum(len(table['fields']) for table in result['tables'].values())
+        output.close()
+    seconds = time.perf_counter() - start
+    print(json.dumps({
+        'files': file_count,
+        'fields': fields,
+        'seconds': round(seconds, 3),
+        'rss_before_mb': round(before, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }))
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_spec_arguments(arg_parser, files=2000, tables_per_file=1, open_calls_per_file=0,
+                       descriptions_per_file=1, fields_per_description=200, shell_ratio=0.25,
+                       blocks_per_script=1, plain_ratio=0.0)
+    arg_parser.add_argument('--workers', type=int, default=1, help='scan worker processes')
+    arg_parser.add_argument('--sink', choices=('dict', 'ndjson'), default='dict',
+                            help='collect results like scan_directory, or stream them to /dev/null')
+    arg_parser.add_argument('--child', metavar='DIRECTORY', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.workers, args.sink)
+        return 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(directory, spec_from_args(args))
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', directory,
+                                    '--workers', str(args.workers), '--sink', args.sink],
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True)
+    report = json.loads(completed.stdout)
+    print(f"{'files':>8} {'fields':>10} {'seconds':>10} {'base MB':>10} {'peak MB':>10} {'scan MB':>10}")
+    print(f"{report['files']:>8} {report['fields']:>10} {report['seconds']:>10.2f} "
+          f"{report['rss_before_mb']:>10.1f} {report['peak_rss_mb']:>10.1f} "
+          f"{report['peak_rss_mb'] - report['rss_before_mb']:>10.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Scaling benchmark for PythonParser.
+
+Generates synthetic PyTables modules of increasing size and times
+``PythonParser.parse`` on each of them.  If the parser is linear in the size
+of the module, the time per ``createTable`` call stays flat as the module
+grows; the run fails when it grows by more than ``--max-ratio``.
+
+    python benchmarks/bench_parser.py
+    python benchmarks/bench_parser.py --sizes 250 500 1000 2000 4000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parser import PythonParser  # noqa: E402
+
+
+def make_module(table_calls: int) -> str:
+    """Build a module with one description class per ten createTable calls"""
+    lines = ['import tables', 'from tables import IsDescription', '']
+    for i in range(max(1, table_calls // 10)):
+        lines.append(f'class Description{i}(IsDescription):')
+        lines.append('    timestamp = Int64Col()')
+        lines.append('    value = FloatCol()')
+        lines.append('    location = StringCol(16)')
+        lines.append('')
+    lines.append('def build(h5file, group):')
+    for i in range(table_calls):
+        lines.append(f"    table_{i} = h5file.createTable(group, 'table_{i}', Description{i // 10})")
+    return '\n'.join(lines) + '\n'
+
+
+def time_parse(content: str, repeat: int) -> float:
+    """Return the best wall-clock time of ``repeat`` parses"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        PythonParser('bench.py', content).parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[100, 200, 400, 800, 1600],
+                            help='number of createTable calls per generated module')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='parses per size (best is kept)')
+    arg_parser.add_argument('--max-ratio', type=float, default=2.0,
+                            help='allowed growth of the per-call time from the smallest to the largest size')
+    args = arg_parser.parse_args()
+
+    print(f"{'calls':>8} {'bytes':>10} {'seconds':>10} {'us/call':>10}")
+    per_call = []
+    for size in args.sizes:
+        content = make_module(size)
+        seconds = time_parse(content, args.repeat)
+        per_call.append(seconds / size)
+        print(f'{size:>8} {len(content):>10} {seconds:>10.4f} {per_call[-1] * 1e6:>10.1f}')
+
+    ratio = per_call[-1] / per_call[0]
+    print(f'per-call time ratio (largest/smallest): {ratio:.2f}')
+    if ratio > args.max_ratio:
+        print(f'FAIL: parser is not scaling linearly (ratio > {args.max_ratio})')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""Throughput, latency and memory suite with a saved-baseline regression check.
+
+Generates a reproducible corpus (see corpus.py) and runs each benchmark in a
+fresh child process, so peak memory is measured in isolation:
+
+    analyze_file     every file through analyze_file
+    python_parser    the .py files through PythonParser.parse
+    shell_parser     the .sh files through ShellParser.parse
+    scan_directory   full scans of the corpus written to disk
+
+Each benchmark reports files per second, p50 and p99 per-file latency as
+the median over --repeat rounds, files per CPU second of its best round
+and the child's peak RSS.  Scan latencies are the gaps between completed
+files, which with --workers above one measure throughput rather than
+parse time.  --output saves the report as JSON; --baseline compares
+against a saved report and exits with 1 when CPU throughput or peak
+memory is worse by more than --tolerance (2 when the baseline used a
+different corpus).  CPU time leaves out the time other processes hold
+the CPU, and a slow round cannot lower the best one; a benchmark that
+still fails is measured again before the run fails.  Wall-clock figures
+are too noisy to gate on and are only reported, as is the CPU throughput
+of benchmarks whose rounds take less than MIN_GATED_SECONDS.
+
+    python benchmarks/bench_suite.py --output baseline.json
+    python benchmarks/bench_suite.py --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from corpus import add_spec_arguments, spec_from_args, write_corpus  # noqa: E402
+
+BENCHMARKS = ('analyze_file', 'python_parser', 'shell_parser', 'scan_directory')
+
+# Metric name -> (True when higher is better, whether --baseline fails on it)
+METRICS = {
+    'files_per_sec': (True, False),
+    'cpu_files_per_sec': (True, True),
+    'p50_ms': (False, False),
+    'p99_ms': (False, False),
+    'peak_rss_mb': (False, True)
+}
+
+# Rounds using less CPU time than this are dominated by timer noise
+MIN_GATED_SECONDS = 0.05
+
+# Times a benchmark failing the baseline check is measured again
+RETRIES = 2
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def load_files(directory: str) -> List[Tuple[str, str, str]]:
+    """Read the corpus into (relative path, content, file type) triples"""
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            with open(path) as f:
+                files.append((os.path.relpath(path, directory), f.read(), name.rsplit('.', 1)[1]))
+    return files
+
+
+def cpu_seconds() -> float:
+    """CPU time of this process and its finished children, such as scan workers"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def time_each(files: List[Tuple[str, str, str]], run: Callable[[str, str, str], Any]) -> List[float]:
+    latencies = []
+    for rel_path, content, file_type in files:
+        start = time.perf_counter()
+        run(rel_path, content, file_type)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def time_scan(directory: str, workers: int) -> List[float]:
+    """Per-file latencies of a scan, taken as the gaps between progress reports"""
+    from scanner import scan_directory
+
+    stamps: List[float] = []
+    scan_directory(directory, workers=workers, progress=lambda done, total: stamps.append(time.perf_counter()))
+    # The first report comes once the files are listed, before any is analyzed
+    return [b - a for a, b in zip(stamps, stamps[1:])]
+
+
+def median(values: List[float]) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def run_child(name: str, directory: str, workers: int, repeat: int) -> Dict[str, Any]:
+    """Run one benchmark ``repeat`` times; wall-clock metrics are medians over the rounds, CPU time the best"""
+    from parser import PythonParser, ShellParser, analyze_file
+
+    files = load_files(directory)
+    python_files = [f for f in files if f[2] == 'py']
+    shell_files = [f for f in files if f[2] == 'sh']
+    rounds: Dict[str, Callable[[], List[float]]] = {
+        'analyze_file': lambda: time_each(files, analyze_file),
+        'python_parser': lambda: time_each(python_files, lambda path, content, _: PythonParser(path, content).parse()),
+        'shell_parser': lambda: time_each(shell_files, lambda path, content, _: ShellParser(path, content).parse()),
+        'scan_directory': lambda: time_scan(directory, workers)
+    }
+
+    measured = []
+    cpu_times = []
+    for _ in range(repeat):
+        started = cpu_seconds()
+        latencies = rounds[name]()
+        if latencies:
+            measured.append(latencies)
+            cpu_times.append(cpu_seconds() - started)
+    if not measured:
+        return {'files': 0}
+
+    best_cpu = min(cpu_times)
+    return {
+        'files': len(measured[0]),
+        'seconds': round(median([sum(latencies) for latencies in measured]), 4),
+        'files_per_sec': round(median([len(latencies) / sum(latencies) for latencies in measured]), 1),
+        'cpu_seconds': round(best_cpu, 4),
+        'cpu_files_per_sec': round(len(measured[0]) / best_cpu, 1) if best_cpu else None,
+        'p50_ms': round(median([percentile(latencies, 0.50) for latencies in measured]) * 1000, 4),
+        'p99_ms': round(median([percentile(latencies, 0.99) for latencies in measured]) * 1000, 4),
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> Dict[str, List[str]]:
+    """Describe, per benchmark, every gated metric worse than the baseline by more than ``tolerance``"""
+    regressions = {}
+    for name, current in report['benchmarks'].items():
+        previous = baseline['benchmarks'].get(name)
+        if not previous or not current.get('files'):
+            continue
+        lines = []
+        for metric, (higher_is_better, gated) in METRICS.items():
+            if not gated:
+                continue
+            if (metric == 'cpu_files_per_sec'
+                    and min(previous.get('cpu_seconds', 0), current['cpu_seconds']) < MIN_GATED_SECONDS):
+                continue
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                lines.append(f'{name}.{metric}: {old} -> {new} ({change:+.1%})')
+        if lines:
+            regressions[name] = lines
+    return regressions
+
+
+def best_of(first: Dict[str, Any], second: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge two measurements of a benchmark, keeping the better value of each metric"""
+    merged = dict(first)
+    for metric, (higher_is_better, _) in METRICS.items():
+        values = [value for value in (first.get(metric), second.get(metric)) if value is not None]
+        if values:
+            merged[metric] = max(values) if higher_is_better else min(values)
+    if merged.get('cpu_files_per_sec') == second.get('cpu_files_per_sec'):
+        merged['cpu_seconds'] = second['cpu_seconds']
+    return merged
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_spec_arguments(arg_parser)
+    arg_parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS),
+                            help='benchmarks to run')
+    arg_parser.add_argument('--workers', type=int, default=1, help='worker processes for scan_directory')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='rounds per benchmark (medians are reported)')
+    arg_parser.add_argument('--output', help='write the report as JSON to this file')
+    arg_parser.add_argument('--baseline', help='JSON report to compare against')
+    arg_parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='allowed relative worsening of throughput and peak memory')
+    arg_parser.add_argument('--child', nargs=2, metavar=('BENCHMARK', 'DIRECTORY'), help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child[0], args.child[1], args.workers, args.repeat)))
+        return 0
+
+    spec = spec_from_args(args)
+    report: Dict[str, Any] = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus': spec.to_dict(),
+        'workers': args.workers,
+        'repeat': args.repeat,
+        'benchmarks': {}
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('corpus') != report['corpus'] or baseline.get('workers') != report['workers']:
+            print('FAIL: the baseline was taken on a different corpus or worker count')
+            return 2
+
+    def measure(name: str) -> Dict[str, Any]:
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name, directory,
+                                    '--workers', str(args.workers), '--repeat', str(args.repeat)],
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True)
+        result = json.loads(completed.stdout)
+        if result['files']:
+            print(f"{name:<16} {result['files']:>7} {result['files_per_sec']:>10.1f} "
+                  f"{result['cpu_files_per_sec']:>10.1f} {result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f} "
+                  f"{result['peak_rss_mb']:>9.1f}")
+        else:
+            print(f"{name:<16} {0:>7}")
+        return result
+
+    print(f"{'benchmark':<16} {'files':>7} {'files/s':>10} {'cpu f/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak MB':>9}")
+    regressions: Dict[str, List[str]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(directory, spec)
+        for name in args.only:
+            report['benchmarks'][name] = measure(name)
+        if baseline is not None:
+            regressions = compare(report, baseline, args.tolerance)
+            # A failure must survive measuring again, so a burst of load elsewhere cannot fail the run
+            for _ in range(RETRIES):
+                if not regressions:
+                    break
+                print(f"measuring again: {', '.join(regressions)}")
+                for name in regressions:
+                    report['benchmarks'][name] = best_of(report['benchmarks'][name], measure(name))
+                regressions = compare(report, baseline, args.tolerance)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+    if baseline is not None:
+        if regressions:
+            lines = [line for name in regressions for line in regressions[name]]
+            print(f'FAIL: {len(lines)} metric(s) regressed by more than {args.tolerance:.0%}:')
+            for line in lines:
+                print(f'  {line}')
+            return 1
+        print(f'OK: no gated metric regressed by more than {args.tolerance:.0%} against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""Throughput of a multi-file upload through the /analyze form.
+
+Posts a synthetic corpus (see corpus.py) as one multipart upload with the
+Flask test client, against a throwaway SQLite database, and reports the
+fastest of --repeat rounds.  SCAN_WORKERS sets how many processes the app
+may use.
+
+    python benchmarks/bench_upload.py --files 500
+    SCAN_WORKERS=1 python benchmarks/bench_upload.py --files 500
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from corpus import add_spec_arguments, generate, spec_from_args  # noqa: E402
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_spec_arguments(arg_parser, files=500)
+    arg_parser.add_argument('--repeat', type=int, default=5, help='rounds (fastest is kept)')
+    args = arg_parser.parse_args()
+
+    files = [(os.path.basename(item['path']), item['content'].encode('utf-8'))
+             for item in generate(spec_from_args(args))]
+    size_mb = sum(len(data) for _, data in files) / (1024 * 1024)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'bench.db')
+        os.environ.setdefault('PARSE_CACHE_PATH', '')
+        import logging
+        from app import app
+        logging.disable(logging.ERROR)
+
+        client = app.test_client()
+        best = None
+        for _ in range(args.repeat):
+            data = {'files[]': [(io.BytesIO(content), name) for name, content in files]}
+            start = time.perf_counter()
+            response = client.post('/analyze', data=data, content_type='multipart/form-data')
+            seconds = time.perf_counter() - start
+            if response.status_code != 302:
+                print(f'upload failed with status {response.status_code}')
+                return 1
+            best = seconds if best is None else min(best, seconds)
+
+    print(f"{'files':>7} {'MB':>7} {'seconds':>9} {'files/s':>9}")
+    print(f'{len(files):>7} {size_mb:>7.2f} {best:>9.3f} {len(files) / best:>9.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
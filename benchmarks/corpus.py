@@ -0,0 +1,151 @@
+"""Synthetic corpus generator shared by the benchmarks.
+
+A corpus is a tree of PyTables modules and shell scripts whose shape is
+fully described by a ``CorpusSpec``.  The same spec and seed always produce
+byte-identical files, so timings taken on different revisions are comparable.
+
+    python benchmarks/corpus.py /tmp/corpus --files 5000 --shell-ratio 0.3
+"""
+import argparse
+import os
+import random
+import sys
+from typing import Any, Dict, List
+
+FIELD_TYPES = ('Int64Col', 'Int32Col', 'FloatCol', 'Float64Col', 'StringCol', 'BoolCol', 'TimeCol')
+
+DEFAULTS: Dict[str, Any] = {
+    'files': 1000,
+    'tables_per_file': 5,
+    'open_calls_per_file': 2,
+    'descriptions_per_file': 2,
+    'fields_per_description': 20,
+    'shared_columns': 0.5,
+    'shell_ratio': 0.2,
+    'blocks_per_script': 2,
+    'plain_ratio': 0.3,
+    'files_per_folder': 100,
+    'seed': 0
+}
+
+
+class CorpusSpec:
+    """Shape of a synthetic corpus; see DEFAULTS for the parameters"""
+    __slots__ = tuple(DEFAULTS)
+
+    def __init__(self, **params: Any):
+        unknown = set(params) - set(DEFAULTS)
+        if unknown:
+            raise TypeError(f"Unknown corpus parameters: {', '.join(sorted(unknown))}")
+        for name, default in DEFAULTS.items():
+            setattr(self, name, params.get(name, default))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in DEFAULTS}
+
+
+def make_module(rng: random.Random, index: int, spec: CorpusSpec) -> str:
+    """A PyTables module with descriptions, createTable and openTable calls"""
+    shared = int(spec.fields_per_description * spec.shared_columns)
+    lines = ['import tables', 'from tables import openFile', '']
+    descriptions = []
+    for d in range(max(1, spec.descriptions_per_file)):
+        name = f'reading_{index}_{d}'
+        descriptions.append(name)
+        lines.append(f'class {name}(tables.IsDescription):')
+        for i in range(spec.fields_per_description):
+            column = f'column_{i}' if i < shared else f'column_{index}_{d}_{i}'
+            lines.append(f'    {column} = {rng.choice(FIELD_TYPES)}()')
+        lines.append('')
+
+    lines.append('def build(h5file, group):')
+    for t in range(spec.tables_per_file):
+        description = descriptions[t % len(descriptions)]
+        # A table named like its description class is the one that gets its fields
+        name = description if t < len(descriptions) else f'table_{index}_{t}'
+        options = ', expectedrows=1000' if rng.random() < 0.1 else ''
+        lines.append(f"    table_{t} = h5file.createTable(group, '{name}', {description}{options})")
+    for t in range(spec.open_calls_per_file):
+        lines.append(f"    existing_{t} = h5file.openTable('/data/table_{index}_{t}')")
+    lines.append('    return h5file')
+    return '\n'.join(lines) + '\n'
+
+
+def make_plain_module(rng: random.Random, index: int) -> str:
+    """A module without any PyTables usage"""
+    lines = ['import os', 'import json', '']
+    for f in range(rng.randint(5, 20)):
+        lines.append(f'def helper_{index}_{f}(path):')
+        lines.append('    with open(path) as handle:')
+        lines.append('        return json.load(handle)')
+        lines.append('')
+    return '\n'.join(lines) + '\n'
+
+
+def make_script(rng: random.Random, index: int, spec: CorpusSpec) -> str:
+    """A shell script embedding Python as heredocs and ``python -c`` one-liners"""
+    lines = ['#!/bin/sh', 'set -e', '']
+    for b in range(spec.blocks_per_script):
+        if b % 2 == 0:
+            lines.append('python <<EOF')
+            lines.append(make_module(rng, index * 100 + b, spec).rstrip('\n'))
+            lines.append('EOF')
+        else:
+            lines.append(f'python -c "import tables; t = h5.createTable(g, inline_{index}_{b}, D)"')
+        lines.append('')
+    lines.append(f'python tools/load_{index}.py > /dev/null')
+    return '\n'.join(lines) + '\n'
+
+
+def generate(spec: CorpusSpec) -> List[Dict[str, str]]:
+    """Return the corpus as a list of {"path", "content"} without touching the disk"""
+    rng = random.Random(spec.seed)
+    files = []
+    for index in range(spec.files):
+        folder = f'pkg_{index // max(1, spec.files_per_folder)}'
+        roll = rng.random()
+        if roll < spec.shell_ratio:
+            path, content = f'{folder}/load_{index}.sh', make_script(rng, index, spec)
+        elif roll < spec.shell_ratio + spec.plain_ratio:
+            path, content = f'{folder}/util_{index}.py', make_plain_module(rng, index)
+        else:
+            path, content = f'{folder}/schema_{index}.py', make_module(rng, index, spec)
+        files.append({'path': path, 'content': content})
+    return files
+
+
+def write_corpus(directory: str, spec: CorpusSpec) -> int:
+    """Write the corpus under ``directory`` and return the number of files"""
+    files = generate(spec)
+    for item in files:
+        path = os.path.join(directory, item['path'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(item['content'])
+    return len(files)
+
+
+def add_spec_arguments(arg_parser: argparse.ArgumentParser, **defaults: Any) -> None:
+    """Add one --option per corpus parameter, with per-benchmark defaults"""
+    for name, default in DEFAULTS.items():
+        default = defaults.get(name, default)
+        arg_parser.add_argument('--' + name.replace('_', '-'), dest=name, type=type(default), default=default,
+                                help=f'corpus parameter (default: {default})')
+
+
+def spec_from_args(args: argparse.Namespace) -> CorpusSpec:
+    return CorpusSpec(**{name: getattr(args, name) for name in DEFAULTS})
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('directory', help='where to write the corpus')
+    add_spec_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    count = write_corpus(args.directory, spec_from_args(args))
+    print(f'wrote {count} files to {args.directory}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Latency and throughput of /api/analyze under concurrent requests.
+
+Sends the files of a synthetic corpus (see corpus.py) from --concurrency
+client threads and reports requests/s and p50/p99 latency, with 503
+(overloaded) answers counted apart.  Without --url a local server is
+started for the run: gunicorn with threaded workers when it is installed,
+the threaded Werkzeug server otherwise.  --api-workers sets API_WORKERS of
+that server (0 parses on the request threads).
+
+    python benchmarks/load_api.py --api-workers 4 --concurrency 64 --requests 5000
+    python benchmarks/load_api.py --url http://127.0.0.1:5000 --concurrency 32
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from corpus import add_spec_arguments, generate, spec_from_args  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, api_workers: int, threads: int, directory: str) -> subprocess.Popen:
+    env = dict(os.environ, API_WORKERS=str(api_workers), METRICS_ENABLED='0', PARSE_CACHE_PATH='',
+               DATABASE_URL='sqlite:///' + os.path.join(directory, 'load.db'))
+    try:
+        import gunicorn  # noqa: F401
+        command = [sys.executable, '-m', 'gunicorn', '--worker-class', 'gthread', '--workers', '1',
+                   '--threads', str(threads), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'main:app']
+    except ImportError:
+        command = [sys.executable, '-c',
+                   'import logging, sys; from app import app; logging.disable(logging.ERROR); '
+                   'app.run(host="127.0.0.1", port=int(sys.argv[1]), threaded=True)', str(port)]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError('server did not start')
+
+
+def post(url: str, body: bytes) -> Tuple[int, float]:
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run(url: str, bodies: List[bytes], concurrency: int, total: int) -> Tuple[Dict[int, List[float]], float]:
+    latencies: Dict[int, List[float]] = {}
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def client() -> None:
+        for index in counter:
+            status, seconds = post(url, bodies[index % len(bodies)])
+            with lock:
+                latencies.setdefault(status, []).append(seconds)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client)
+    return latencies, time.perf_counter() - started
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_spec_arguments(arg_parser, files=200)
+    arg_parser.add_argument('--url', help='server to load (default: start one locally)')
+    arg_parser.add_argument('--api-workers', type=int, default=os.cpu_count() or 1,
+                            help='API_WORKERS of the local server')
+    arg_parser.add_argument('--threads', type=int, default=64, help='request threads of the local server')
+    arg_parser.add_argument('--concurrency', type=int, default=32, help='client threads')
+    arg_parser.add_argument('--requests', type=int, default=2000, help='requests to send')
+    args = arg_parser.parse_args()
+
+    bodies = [json.dumps({'filename': item['path'], 'content': item['content']}).encode('utf-8')
+              for item in generate(spec_from_args(args))]
+
+    with tempfile.TemporaryDirectory() as directory:
+        server: Optional[subprocess.Popen] = None
+        base_url = args.url
+        if base_url is None:
+            port = free_port()
+            server = start_server(port, args.api_workers, args.threads, directory)
+            base_url = f'http://127.0.0.1:{port}'
+        try:
+            url = base_url.rstrip('/') + '/api/analyze'
+            # Warm up the server and its pool
+            run(url, bodies, min(args.concurrency, 4), min(len(bodies), 50))
+            latencies, seconds = run(url, bodies, args.concurrency, args.requests)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    ok = latencies.get(200, [])
+    print(f"{'requests':>9} {'ok':>7} {'503':>7} {'failed':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    failed = sum(len(values) for status, values in latencies.items() if status not in (200, 503))
+    print(f'{args.requests:>9} {len(ok):>7} {len(latencies.get(503, [])):>7} {failed:>7} '
+          f'{len(ok) / seconds:>9.1f} {percentile(ok, 0.5) * 1000:>9.1f} {percentile(ok, 0.99) * 1000:>9.1f}')
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
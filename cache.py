@@ -0,0 +1,346 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+import parser as parser_module
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'pytable-analyzer', 'parse-cache.sqlite3')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Evicting down to a fraction of the limit keeps every scan from evicting again
+EVICT_TARGET_RATIO = 0.9
+
+# Writes are buffered and committed this many at a time, so the write lock is
+# only held while a batch is written and scans sharing a cache take turns
+WRITE_BATCH_SIZE = 256
+
+# Seconds a write waits for another handle's batch before it is given up
+LOCK_TIMEOUT = 2
+
+# Bounds of the in-memory ResultCache of /api/analyze
+DEFAULT_RESULT_CACHE_ENTRIES = 1024
+DEFAULT_RESULT_CACHE_BYTES = 64 * 1024 * 1024
+
+_parser_version: Optional[str] = None
+
+def parser_version() -> str:
+    """Return a stamp that changes whenever parser.py changes"""
+    global _parser_version
+    if _parser_version is None:
+        with open(parser_module.__file__, 'rb') as f:
+            _parser_version = hashlib.sha256(f.read()).hexdigest()[:16]
+    return _parser_version
+
+def content_digest(data: bytes) -> str:
+    """Content address used as the cache key"""
+    return hashlib.sha256(data).hexdigest()
+
+class ParseCache:
+    """On-disk cache of analyze_file results keyed by content hash and parser version
+
+    Results are stored without their filename, so the same content found
+    under several paths is parsed once.  A second table maps a path to the
+    digest it had at a given mtime and size, which lets unchanged files be
+    served without reading them at all.
+
+    Writes are buffered and committed WRITE_BATCH_SIZE at a time and on
+    flush, so several scans can share one cache file.
+    """
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 version: Optional[str] = None, readonly: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version or parser_version()
+        self.readonly = readonly
+        self.hits = 0
+        self.misses = 0
+        self._touched: Dict[Tuple[str, str], float] = {}
+        # Writes not committed yet, written by _write_pending
+        self._pending_results: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._pending_paths: Dict[str, Tuple[int, int, str]] = {}
+
+        if readonly:
+            # Lookup-only handle for scan workers; the scanning process does all writes
+            self.conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, timeout=30)
+            return
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=LOCK_TIMEOUT)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        # Creating the schema takes the write lock even when it exists, and
+        # another scan may be writing
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'files'").fetchone() is None:
+            self._create_schema()
+        # Results produced by any other parser.py are stale; lookups skip
+        # them, so they are left for a later handle when the cache is busy
+        if self.conn.execute('SELECT 1 FROM results WHERE version != ? LIMIT 1', (self.version,)).fetchone():
+            try:
+                self.conn.execute('DELETE FROM results WHERE version != ?', (self.version,))
+                self.conn.commit()
+            except sqlite3.OperationalError as e:
+                self.conn.rollback()
+                logging.warning(f"Stale entries of parse cache {path} left in place: {str(e)}")
+
+    def _create_schema(self) -> None:
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS results (
+                digest TEXT NOT NULL,
+                file_type TEXT NOT NULL,
+                version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (digest, file_type, version)
+            );
+            CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                digest TEXT NOT NULL
+            );
+        ''')
+
+    def __enter__(self) -> 'ParseCache':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Flush pending writes, enforce the size limit and close the database"""
+        try:
+            if not self.readonly:
+                self.flush()
+        finally:
+            self.conn.close()
+
+    def lookup_path(self, file_path: str, mtime_ns: int, size: int, file_type: str) -> Optional[Dict[str, Any]]:
+        """Fast path: return the cached result if the file is unchanged since it was last seen"""
+        try:
+            row = self.conn.execute(
+                'SELECT r.digest, r.result FROM files f JOIN results r ON r.digest = f.digest '
+                'WHERE f.path = ? AND f.mtime_ns = ? AND f.size = ? AND r.file_type = ? AND r.version = ?',
+                (os.path.abspath(file_path), mtime_ns, size, file_type, self.version)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # A busy cache is a miss
+            return None
+        if row is None:
+            return None
+        self.touch(row[0], file_type)
+        return json.loads(row[1])
+
+    def get(self, digest: str, file_type: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for some content, without its filename"""
+        pending = self._pending_results.get((digest, file_type))
+        if pending is not None:
+            return json.loads(pending[0])
+        try:
+            row = self.conn.execute(
+                'SELECT result FROM results WHERE digest = ? AND file_type = ? AND version = ?',
+                (digest, file_type, self.version)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        if row is None:
+            return None
+        self.touch(digest, file_type)
+        return json.loads(row[0])
+
+    def touch(self, digest: str, file_type: str) -> None:
+        """Mark an entry as used; access times are written back with the next batch"""
+        self._touched[(digest, file_type)] = time.time()
+
+    def put(self, digest: str, file_type: str, result: Dict[str, Any]) -> None:
+        """Store a result; the filename and timings are dropped since the key is the content"""
+        payload = json.dumps({k: v for k, v in result.items() if k not in ('filename', 'folder_path', 'timings')})
+        self._pending_results[(digest, file_type)] = (payload, time.time())
+        if len(self._pending_results) + len(self._pending_paths) >= WRITE_BATCH_SIZE:
+            self._commit()
+
+    def remember_path(self, file_path: str, mtime_ns: int, size: int, digest: str) -> None:
+        """Record which content a path had at a given mtime and size"""
+        self._pending_paths[os.path.abspath(file_path)] = (mtime_ns, size, digest)
+        if len(self._pending_results) + len(self._pending_paths) >= WRITE_BATCH_SIZE:
+            self._commit()
+
+    def flush(self) -> None:
+        """Write pending results and access times back, evict over-size entries and commit"""
+        self._commit(evict=True)
+
+    def _commit(self, evict: bool = False) -> None:
+        """Write the buffered writes in one short transaction
+
+        If another handle holds the write lock for more than LOCK_TIMEOUT
+        seconds the batch is dropped and logged: its files are parsed again
+        by a later scan instead of this one failing.
+        """
+        results, self._pending_results = self._pending_results, {}
+        paths, self._pending_paths = self._pending_paths, {}
+        touched, self._touched = self._touched, {}
+        try:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO results (digest, file_type, version, result, size, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                ((digest, file_type, self.version, payload, len(payload), used)
+                 for (digest, file_type), (payload, used) in results.items())
+            )
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO files (path, mtime_ns, size, digest) VALUES (?, ?, ?, ?)',
+                ((path, mtime_ns, size, digest) for path, (mtime_ns, size, digest) in paths.items())
+            )
+            self.conn.executemany(
+                'UPDATE results SET last_used = ? WHERE digest = ? AND file_type = ? AND version = ?',
+                ((used, digest, file_type, self.version) for (digest, file_type), used in touched.items())
+            )
+            if evict:
+                self.evict()
+            self.conn.commit()
+        except sqlite3.OperationalError as e:
+            self.conn.rollback()
+            logging.warning(f"Parse cache {self.path} is busy, dropped {len(results)} results "
+                            f"and {len(paths)} paths: {str(e)}")
+
+    def evict(self) -> int:
+        """Drop least recently used results until the cache fits in max_bytes"""
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        target = total - int(self.max_bytes * EVICT_TARGET_RATIO)
+        victims = []
+        freed = 0
+        for rowid, size in self.conn.execute('SELECT rowid, size FROM results ORDER BY last_used'):
+            victims.append((rowid,))
+            freed += size
+            if freed >= target:
+                break
+        self.conn.executemany('DELETE FROM results WHERE rowid = ?', victims)
+        self.conn.execute('DELETE FROM files WHERE digest NOT IN (SELECT digest FROM results)')
+        logging.info(f"Evicted {len(victims)} entries ({freed} bytes) from parse cache {self.path}")
+        return len(victims)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this cache handle plus the size of the store"""
+        entries, size = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'version': self.version
+        }
+
+class ResultCache:
+    """In-memory LRU of analyze_file results for requests that repeat the same content
+
+    Keyed like ParseCache by content hash, file type and parser version, and
+    bounded by ``max_entries`` and by ``max_bytes`` of the results' JSON
+    size.  With ``ttl`` (seconds) entries older than that are parsed again.
+    Safe to share between request threads.
+    """
+    def __init__(self, max_entries: int = DEFAULT_RESULT_CACHE_ENTRIES,
+                 max_bytes: int = DEFAULT_RESULT_CACHE_BYTES, ttl: Optional[float] = None,
+                 version: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = version or parser_version()
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[Dict[str, Any], int, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def etag(self, digest: str, file_type: str, filename: str) -> str:
+        """Entity tag of the response for this content; it changes with the parser"""
+        key = f'{digest}\0{file_type}\0{self.version}\0{filename}'
+        return hashlib.sha256(key.encode('utf-8', 'surrogatepass')).hexdigest()[:32]
+
+    def get(self, digest: str, file_type: str) -> Optional[Dict[str, Any]]:
+        """The cached result without its filename, counting a hit or a miss"""
+        key = (digest, file_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, digest: str, file_type: str, result: Dict[str, Any]) -> None:
+        """Store a result; the filename and timings are dropped as in ParseCache.put"""
+        stored = {k: v for k, v in result.items() if k not in ('filename', 'folder_path', 'timings')}
+        size = len(json.dumps(stored))
+        if size > self.max_bytes:
+            return
+        key = (digest, file_type)
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (stored, size, time.monotonic())
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _discard(self, key: Tuple[str, str]) -> None:
+        self.size -= self._entries.pop(key)[1]
+
+    def count_not_modified(self) -> None:
+        """Count a request answered 304 from the client's copy"""
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and the size of the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'version': self.version
+            }
+
+def with_filename(cached: Dict[str, Any], filename: str) -> Dict[str, Any]:
+    """Rebuild a full result from a cached one, keeping 'filename' as the first key"""
+    result = {'filename': filename}
+    result.update(cached)
+    return result
+
+def open_cache(path: Optional[str], max_bytes: int = DEFAULT_MAX_BYTES) -> Optional[ParseCache]:
+    """Open the cache at ``path``, or return None if caching is disabled or unavailable"""
+    if not path:
+        return None
+    try:
+        return ParseCache(path, max_bytes)
+    except (sqlite3.Error, OSError) as e:
+        logging.error(f"Parse cache unavailable at {path}: {str(e)}")
+        return None
@@ -0,0 +1,221 @@
+"""Scan Python and Shell scripts for PyTable tables without the web app.
+
+    python cli.py src tools/load.sh --jobs 4 --exclude 'tests/*' --format ndjson -o tables.ndjson
+
+Results are keyed by path and written as JSON ({path: result}) or NDJSON
+(one {"path", "result"} object per line) to stdout or --output while the
+files of a directory are being analyzed.  The exit status is 0 when every
+file was analyzed, 1 when any file has an error result and 2 on usage
+errors or unreadable paths.  Python files in a directory that cannot
+define a table are not parsed, so their syntax errors only count with
+--strict; single files and revisions are always parsed.
+
+With --rev each PATH is a git repository scanned at that revision straight
+from its object database, and --diff OLD NEW reports the tables and fields
+added, removed or changed between two revisions of one repository.
+
+Only the standard library and the scanning modules are imported, and those
+only once the arguments are parsed, so the command starts fast and runs
+anywhere Python does.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+EXIT_OK = 0
+EXIT_PARSE_ERRORS = 1
+EXIT_USAGE = 2
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser(prog='cli.py', description=__doc__.splitlines()[0])
+    arg_parser.add_argument('paths', nargs='+', metavar='PATH', help='directories to scan recursively, or single files')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help='worker processes for directory scans (0 = one per CPU, default: 1)')
+    arg_parser.add_argument('--include', action='append', default=[], metavar='GLOB',
+                            help='only scan files whose relative path or name matches (repeatable)')
+    arg_parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                            help='skip files and directories whose relative path or name matches (repeatable)')
+    arg_parser.add_argument('--no-gitignore', dest='gitignore', action='store_false',
+                            help='also scan files ignored by .gitignore')
+    arg_parser.add_argument('--no-default-excludes', dest='default_excludes', action='store_false',
+                            help='also walk VCS, cache, virtualenv, node_modules and build directories')
+    arg_parser.add_argument('--follow-symlinks', action='store_true', help='walk into symlinked directories')
+    arg_parser.add_argument('--max-file-size', type=int, metavar='BYTES', help='skip files larger than this')
+    arg_parser.add_argument('--strict', action='store_true',
+                            help='in directories, also parse Python files that cannot define a table')
+    arg_parser.add_argument('-f', '--format', choices=('json', 'ndjson'), default='json', help='output format')
+    arg_parser.add_argument('-o', '--output', metavar='FILE', help='write results here instead of stdout')
+    arg_parser.add_argument('--cache', metavar='FILE', help='SQLite parse cache to reuse between runs')
+    arg_parser.add_argument('--rev', metavar='REF', help='scan this git revision of each PATH, a repository')
+    arg_parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'),
+                            help='report table and field changes between two git revisions of PATH')
+    arg_parser.add_argument('-q', '--quiet', action='store_true', help='do not print the summary to stderr')
+    return arg_parser
+
+class PathError(Exception):
+    """A PATH argument cannot be scanned"""
+
+def check_paths(paths: List[str], rev: Optional[str] = None) -> None:
+    """Raise PathError for a path that does not exist or is not a supported file"""
+    from scanner import allowed_file
+
+    for path in paths:
+        if rev or os.path.isdir(path):
+            continue
+        if not os.path.isfile(path):
+            raise PathError(f"No such file or directory: {path}")
+        if not allowed_file(path):
+            raise PathError(f"Unsupported file type: {path}")
+
+def iter_paths(paths: List[str], jobs: int, include: List[str], exclude: List[str],
+               cache=None, rev: Optional[str] = None, walk_options: Optional[Dict[str, Any]] = None,
+               stats: Optional[Dict[str, Any]] = None, strict: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (key, result) for every file as soon as it is analyzed
+
+    Keys are the path as given joined with the path inside it, and results
+    get them as 'filename' and their directory as 'folder_path'.  Directories
+    stream through scanner.iter_scan, so output starts before the scan ends;
+    ``walk_options``, ``stats`` and ``strict`` are passed on to it.
+    """
+    from scanner import analyze_path, iter_scan
+
+    for path in paths:
+        if rev:
+            from revisions import GitError, scan_revision
+
+            try:
+                scanned = scan_revision(path, rev, cache, jobs or None, include, exclude).items()
+            except GitError as e:
+                raise PathError(f"{path}: {str(e)}")
+        elif os.path.isdir(path):
+            scanned = ((rel_path, result) for _, rel_path, result, _ in
+                       iter_scan(path, workers=jobs or None, cache=cache, stats=stats, include=include,
+                                 exclude=exclude, strict=strict, **(walk_options or {})))
+        else:
+            # A file that cannot be read or parsed is an error result
+            key = os.path.normpath(path)
+            yield key, analyze_path(path, key, cache)[0]
+            continue
+        for rel_path, result in scanned:
+            key = os.path.normpath(os.path.join(path, rel_path))
+            result['filename'] = key
+            result['folder_path'] = os.path.dirname(key)
+            yield key, result
+
+def run_diff(args: argparse.Namespace, cache=None) -> int:
+    """Write the table changes between the --diff revisions of the single PATH as JSON
+
+    Without a ``cache`` both revisions share an in-memory one, so blobs they
+    have in common are parsed once.
+    """
+    import json
+    from cache import ParseCache
+    from revisions import GitError, diff_revisions, scan_revision
+
+    if len(args.paths) != 1:
+        print("error: --diff takes exactly one repository PATH", file=sys.stderr)
+        return EXIT_USAGE
+    old, new = args.diff
+    own_cache = cache is None
+    if own_cache:
+        cache = ParseCache(':memory:')
+    try:
+        old_results = scan_revision(args.paths[0], old, cache, args.jobs or None, args.include, args.exclude)
+        new_results = scan_revision(args.paths[0], new, cache, args.jobs or None, args.include, args.exclude)
+    except GitError as e:
+        print(f"error: {str(e)}", file=sys.stderr)
+        return EXIT_USAGE
+    finally:
+        if own_cache:
+            cache.close()
+
+    report = {'old': old, 'new': new}
+    report.update(diff_revisions(old_results, new_results))
+    output = json.dumps(report, indent=2) + '\n'
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+    if not args.quiet:
+        print(f"{old}..{new}: {len(report['added_tables'])} tables added, {len(report['removed_tables'])} removed, "
+              f"{len(report['changed_tables'])} changed", file=sys.stderr)
+    return EXIT_OK
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    # Files that fail are listed in the summary instead of being logged as they happen
+    logging.disable(logging.ERROR)
+    started = time.perf_counter()
+
+    cache = None
+    if args.cache:
+        from cache import open_cache
+        cache = open_cache(args.cache)
+
+    if args.diff:
+        try:
+            return run_diff(args, cache)
+        finally:
+            if cache is not None:
+                cache.close()
+
+    from export import iter_export
+
+    summary = {'files': 0, 'tables': 0}
+    stats: Dict[str, Any] = {}
+    walk_options = {'gitignore': args.gitignore, 'default_excludes': args.default_excludes,
+                    'follow_symlinks': args.follow_symlinks, 'max_file_size': args.max_file_size}
+    failed: List[Tuple[str, str]] = []
+
+    def counted(items: Iterator[Tuple[str, Dict[str, Any]]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for key, result in items:
+            summary['files'] += 1
+            summary['tables'] += len(result.get('tables', {}))
+            if 'error' in result:
+                failed.append((key, result['error']))
+            yield key, result
+
+    try:
+        check_paths(args.paths, args.rev)
+        chunks = iter_export(counted(iter_paths(args.paths, args.jobs, args.include, args.exclude,
+                                                cache, args.rev, walk_options, stats, args.strict)),
+                           args.format)
+        if args.output:
+            with open(args.output, 'wb') as f:
+                f.writelines(chunks)
+        else:
+            try:
+                out = sys.stdout.buffer
+                for chunk in chunks:
+                    out.write(chunk)
+                    out.flush()
+                if args.format == 'json':
+                    out.write(b'\n')
+                    out.flush()
+            except BrokenPipeError:
+                # The reader went away (| head); keep Python from complaining again at exit
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except PathError as e:
+        print(f"error: {str(e)}", file=sys.stderr)
+        return EXIT_USAGE
+    finally:
+        if cache is not None:
+            cache.close()
+
+    if not args.quiet:
+        for key, error in failed:
+            print(f"{key}: {error}", file=sys.stderr)
+        print(f"Scanned {summary['files']} files: {summary['tables']} tables, {len(failed)} errors "
+              f"in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+        if 'walk_seconds' in stats:
+            print(f"Walk {stats['walk_seconds']:.2f}s ({stats['dirs_pruned']} directories pruned, "
+                  f"{stats['files_too_large']} files too large), read and parse {stats['analyze_seconds']:.2f}s",
+                  file=sys.stderr)
+    return EXIT_PARSE_ERRORS if failed else EXIT_OK
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import json
+import zlib
+from typing import Dict, Any, Iterable, Iterator, Tuple
+
+EXPORT_FORMATS = {
+    'json': ('application/json', '.json'),
+    'ndjson': ('application/x-ndjson', '.ndjson'),
+}
+
+# Serialized records are coalesced into chunks of about this size before being written
+CHUNK_SIZE = 64 * 1024
+
+def iter_ndjson(items: Iterable[Tuple[str, Dict[str, Any]]]) -> Iterator[str]:
+    """One JSON object per line: {"path": ..., "result": {...}}"""
+    for path, result in items:
+        yield json.dumps({'path': path, 'result': result}) + '\n'
+
+def iter_json(items: Iterable[Tuple[str, Dict[str, Any]]], indent: int = 2) -> Iterator[str]:
+    """The {path: result} document json.dump(..., indent=indent) would write, one file at a time"""
+    padding = ' ' * indent
+    separator = '{\n'
+    for path, result in items:
+        body = json.dumps(result, indent=indent).replace('\n', '\n' + padding)
+        yield f'{separator}{padding}{json.dumps(path)}: {body}'
+        separator = ',\n'
+    yield '{}' if separator == '{\n' else '\n}'
+
+def iter_chunks(parts: Iterable[str], size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Encode and coalesce small string parts into chunks of roughly ``size`` bytes"""
+    buffer = []
+    buffered = 0
+    for part in parts:
+        data = part.encode('utf-8')
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b''.join(buffer)
+
+def iter_gzip(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a byte stream incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def iter_export(items: Iterable[Tuple[str, Dict[str, Any]]], fmt: str = 'json', compress: bool = False) -> Iterator[bytes]:
+    """Serialize (path, result) pairs as ``fmt``, optionally gzipped, as a stream of byte chunks"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    parts = iter_ndjson(items) if fmt == 'ndjson' else iter_json(items)
+    chunks = iter_chunks(parts)
+    return iter_gzip(chunks) if compress else chunks
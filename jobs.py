@@ -0,0 +1,102 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable
+
+from flask import Flask, url_for
+
+from cache import open_cache
+from models import db, Scan, ScanJob, save_scan, purge_expired_scans
+from scanner import scan_directory
+from search import index_scan
+
+# Progress is written to the job table at most this often
+PROGRESS_INTERVAL = 0.5
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def scan_folder(app: Flask, folder_path: str, progress: Optional[Callable[[int, int], None]] = None):
+    """scan_directory with the app's worker count and parse cache"""
+    cache = open_cache(app.config['PARSE_CACHE_PATH'], app.config['PARSE_CACHE_MAX_BYTES'])
+    stats: Dict[str, int] = {}
+    try:
+        return scan_directory(folder_path, workers=app.config['SCAN_WORKERS'], cache=cache,
+                              progress=progress, stats=stats, timings=app.config['SCAN_TIMINGS'],
+                              gitignore=app.config['SCAN_GITIGNORE'],
+                              max_file_size=app.config['SCAN_MAX_FILE_SIZE'] or None)
+    finally:
+        logging.info(f"Scanned {folder_path}: {stats}")
+        if cache is not None:
+            logging.info(f"Parse cache after scanning {folder_path}: {cache.stats()}")
+            cache.close()
+
+def store_scan(app: Flask, results: Dict[str, Dict[str, Any]]) -> Scan:
+    """Persist finished results, build their search index and expire old scans"""
+    purge_expired_scans(app.config['SCAN_RETENTION'], app.config['MAX_STORED_SCANS'])
+    scan = save_scan(results)
+    index_scan(scan.id, results)
+    return scan
+
+def submit_scan_job(app: Flask, folder_path: str) -> ScanJob:
+    """Record a new job and start scanning the folder on the local job pool"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=app.config['SCAN_JOB_WORKERS'], thread_name_prefix='scan-job')
+
+    job = ScanJob(folder_path=folder_path)
+    db.session.add(job)
+    db.session.commit()
+    _executor.submit(_run_job, app, job.id)
+    return job
+
+def _run_job(app: Flask, job_id: str) -> None:
+    with app.app_context():
+        job = db.session.get(ScanJob, job_id)
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        last_update = 0.0
+
+        def progress(done: int, total: int) -> None:
+            nonlocal last_update
+            now = time.monotonic()
+            if done == total or now - last_update >= PROGRESS_INTERVAL:
+                job.files_processed = done
+                job.files_total = total
+                db.session.commit()
+                last_update = now
+
+        try:
+            results, file_count = scan_folder(app, job.folder_path, progress)
+            if isinstance(results, dict) and 'error' in results:
+                job.error = results['error']
+            elif file_count == 0:
+                job.error = f'No supported files found in directory: {job.folder_path}'
+            else:
+                job.scan_id = store_scan(app, results).id
+        except Exception as e:
+            logging.error(f"Scan job {job_id} failed: {str(e)}")
+            db.session.rollback()
+            job.error = f"Error scanning directory: {str(e)}"
+
+        job.status = 'failed' if job.error else 'done'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+def job_status(job: ScanJob) -> Dict[str, Any]:
+    """Progress report served by /api/jobs/<id>"""
+    end = job.finished_at or datetime.utcnow()
+    elapsed = (end - job.started_at).total_seconds() if job.started_at else 0.0
+    return {
+        'id': job.id,
+        'status': job.status,
+        'folder_path': job.folder_path,
+        'files_processed': job.files_processed,
+        'files_total': job.files_total,
+        'elapsed_seconds': round(elapsed, 3),
+        'files_per_second': round(job.files_processed / elapsed, 2) if elapsed > 0 else 0.0,
+        'error': job.error,
+        'result_url': url_for('show_results', scan_id=job.scan_id) if job.scan_id else None
+    }
@@ -0,0 +1,173 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Any, Optional, Tuple
+
+# Prometheus text exposition format served by /metrics
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+_enabled = False
+
+def enable(enabled: bool = True) -> None:
+    """Switch recording into the registry on or off for this process"""
+    global _enabled
+    _enabled = enabled
+
+def is_enabled() -> bool:
+    return _enabled
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic count, optionally split by labels"""
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = dict(self._values) or ({(): 0} if not self.labelnames else {})
+        for key, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values, optionally split by labels"""
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            # One slot per bucket, then +Inf, sum
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            all_series = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(all_series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(series[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+FILES_SCANNED = Counter('pytable_files_scanned_total', 'Files analyzed, including cache hits and prefiltered files')
+BYTES_READ = Counter('pytable_bytes_read_total', 'Bytes of source read from disk, uploads and requests')
+PARSE_ERRORS = Counter('pytable_parse_errors_total', 'Files whose analysis ended in an error result')
+PHASE_SECONDS = Histogram('pytable_phase_seconds', 'Time spent in each analysis phase', ('phase',))
+
+API_REJECTED = Counter('pytable_api_rejected_total', 'Analysis requests answered 503 because the queue was full')
+RESULT_CACHE_REQUESTS = Counter('pytable_result_cache_requests_total',
+                                'Analysis requests by in-memory result cache outcome (hit, miss, not_modified)',
+                                ('outcome',))
+
+REGISTRY = [FILES_SCANNED, BYTES_READ, PARSE_ERRORS, PHASE_SECONDS, API_REJECTED, RESULT_CACHE_REQUESTS]
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+class PhaseTimer:
+    """Wall time spent per phase while analyzing one file
+
+    Timers are plain data so pool workers can send them back to the scanning
+    process, which records them; each process has its own registry.
+    """
+    __slots__ = ('seconds', 'bytes_read')
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.bytes_read = 0
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - started
+
+    def add_bytes(self, count: int) -> None:
+        self.bytes_read += count
+
+    def as_ms(self) -> Dict[str, float]:
+        """Per-phase milliseconds, as attached to results"""
+        return {name: round(seconds * 1000, 3) for name, seconds in self.seconds.items()}
+
+class _NullTimer:
+    """Stand-in used when nothing is measured; every phase is the same no-op context"""
+    __slots__ = ()
+    _context = nullcontext()
+
+    def phase(self, name: str):
+        return self._context
+
+    def add_bytes(self, count: int) -> None:
+        pass
+
+NULL_TIMER = _NullTimer()
+
+def new_timer(force: bool = False):
+    """A PhaseTimer when metrics are enabled or timings were asked for, else NULL_TIMER"""
+    return PhaseTimer() if _enabled or force else NULL_TIMER
+
+def record_file(result: Dict[str, Any], timer: Optional[Any] = None) -> None:
+    """Count one analyzed file and observe its phase timings"""
+    if not _enabled:
+        return
+    FILES_SCANNED.inc()
+    if 'error' in result:
+        PARSE_ERRORS.inc()
+    if isinstance(timer, PhaseTimer):
+        BYTES_READ.inc(timer.bytes_read)
+        for phase, seconds in timer.seconds.items():
+            PHASE_SECONDS.observe(seconds, phase=phase)
+
+def observe_phase(phase: str, seconds: float) -> None:
+    """Record a phase measured outside a PhaseTimer, such as template rendering"""
+    if _enabled:
+        PHASE_SECONDS.observe(seconds, phase=phase)
@@ -0,0 +1,194 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import insert, delete, select, func, update
+from sqlalchemy.orm import DeclarativeBase
+
+class Base(DeclarativeBase):
+    pass
+
+db = SQLAlchemy(model_class=Base)
+
+class Scan(db.Model):
+    """One analysis run; its per-file results live in ScanFile rows"""
+    __tablename__ = 'scans'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    file_count = db.Column(db.Integer, nullable=False, default=0)
+    table_count = db.Column(db.Integer, nullable=False, default=0)
+
+class ScanFile(db.Model):
+    """The analysis result of a single file within a scan"""
+    __tablename__ = 'scan_files'
+    __table_args__ = (
+        db.Index('ix_scan_files_scan_position', 'scan_id', 'position'),
+        db.Index('ix_scan_files_scan_folder', 'scan_id', 'folder_path', 'position'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    scan_id = db.Column(db.String(32), db.ForeignKey('scans.id', ondelete='CASCADE'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    path = db.Column(db.Text, nullable=False)
+    folder_path = db.Column(db.Text, nullable=False, default='')
+    result = db.Column(db.Text, nullable=False)
+
+class SearchTerm(db.Model):
+    """A distinct lowercased name, type or path occurring in a scan"""
+    __tablename__ = 'search_terms'
+    __table_args__ = (
+        db.Index('ix_search_terms_scan_term', 'scan_id', 'term'),
+    )
+
+    scan_id = db.Column(db.String(32), primary_key=True)
+    term_no = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.Text, nullable=False)
+
+class SearchTrigram(db.Model):
+    """The terms of a scan containing one trigram, for substring queries"""
+    __tablename__ = 'search_trigrams'
+
+    scan_id = db.Column(db.String(32), primary_key=True)
+    trigram = db.Column(db.String(3), primary_key=True)
+    postings = db.Column(db.LargeBinary, nullable=False)
+
+class SearchEntry(db.Model):
+    """An occurrence of a search term: a file path, table, variable, field or field type
+
+    Variable occurrences store the variable name in field_name.
+    """
+    __tablename__ = 'search_entries'
+    __table_args__ = (
+        db.Index('ix_search_entries_scan_term', 'scan_id', 'term_no'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    scan_id = db.Column(db.String(32), nullable=False)
+    term_no = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(16), nullable=False)
+    path = db.Column(db.Text, nullable=False)
+    table_name = db.Column(db.Text)
+    field_name = db.Column(db.Text)
+    field_type = db.Column(db.Text)
+
+# Statuses of jobs whose worker is done with them
+FINISHED_JOB_STATUSES = ('done', 'failed')
+
+class ScanJob(db.Model):
+    """A folder scan running in the background and its progress"""
+    __tablename__ = 'scan_jobs'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    folder_path = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='queued')
+    files_total = db.Column(db.Integer)
+    files_processed = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    scan_id = db.Column(db.String(32))
+    error = db.Column(db.Text)
+
+def save_scan(results: Dict[str, Dict[str, Any]]) -> Scan:
+    """Persist a {path: result} mapping as a new scan and return it"""
+    scan = Scan(
+        file_count=len(results),
+        table_count=sum(len(result.get('tables', {})) for result in results.values() if 'error' not in result)
+    )
+    db.session.add(scan)
+    db.session.flush()
+
+    rows = [
+        {
+            'scan_id': scan.id,
+            'position': position,
+            'path': path,
+            'folder_path': result.get('folder_path', ''),
+            'result': json.dumps(result)
+        }
+        for position, (path, result) in enumerate(results.items())
+    ]
+    if rows:
+        db.session.execute(insert(ScanFile), rows)
+    db.session.commit()
+    return scan
+
+def get_scan(scan_id: Optional[str]) -> Optional[Scan]:
+    """Return a stored scan, or None if it does not exist (expired scans are purged)"""
+    if not scan_id:
+        return None
+    return db.session.get(Scan, scan_id)
+
+def iter_scan_results(scan_id: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (path, result) pairs of a scan in their original order"""
+    query = (
+        select(ScanFile.path, ScanFile.result)
+        .where(ScanFile.scan_id == scan_id)
+        .order_by(ScanFile.position)
+        .execution_options(yield_per=500)
+    )
+    for path, result in db.session.execute(query):
+        yield path, json.loads(result)
+
+def scan_folders(scan_id: str) -> List[Tuple[str, int]]:
+    """(folder_path, file count) of every folder in a scan, in scan order"""
+    query = (
+        select(ScanFile.folder_path, func.count())
+        .where(ScanFile.scan_id == scan_id)
+        .group_by(ScanFile.folder_path)
+        .order_by(func.min(ScanFile.position))
+    )
+    return [(folder, count) for folder, count in db.session.execute(query)]
+
+def scan_files_page(scan_id: str, folder_path: str, page: int, per_page: int) -> Tuple[int, List[Tuple[str, Dict[str, Any]]]]:
+    """One page of a folder's (path, result) pairs, and the folder's total file count"""
+    in_folder = (ScanFile.scan_id == scan_id) & (ScanFile.folder_path == folder_path)
+    total = db.session.scalar(select(func.count()).select_from(ScanFile).where(in_folder))
+    query = (
+        select(ScanFile.path, ScanFile.result)
+        .where(in_folder)
+        .order_by(ScanFile.position)
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+    )
+    return total, [(path, json.loads(result)) for path, result in db.session.execute(query)]
+
+def fail_interrupted_jobs(max_age: timedelta) -> int:
+    """Mark queued or running jobs older than max_age as failed
+
+    Such a job lost its worker to a restart or a crash, and its status page
+    would otherwise poll forever.  Returns the number of jobs marked.
+    """
+    now = datetime.utcnow()
+    marked = db.session.execute(
+        update(ScanJob)
+        .where(ScanJob.created_at < now - max_age, ScanJob.status.not_in(FINISHED_JOB_STATUSES))
+        .values(status='failed', error='interrupted', finished_at=now)
+    ).rowcount
+    db.session.commit()
+    return marked
+
+def purge_expired_scans(max_age: timedelta, max_scans: int) -> int:
+    """Delete scans older than max_age and all but the newest max_scans, plus old finished jobs"""
+    fail_interrupted_jobs(max_age)
+    cutoff = datetime.utcnow() - max_age
+    # Jobs are kept for max_age after they finish, interrupted ones included
+    db.session.execute(delete(ScanJob).where(func.coalesce(ScanJob.finished_at, ScanJob.created_at) < cutoff,
+                                             ScanJob.status.in_(FINISHED_JOB_STATUSES)))
+    expired = set(db.session.scalars(select(Scan.id).where(Scan.created_at < cutoff)))
+    expired.update(db.session.scalars(
+        select(Scan.id).order_by(Scan.created_at.desc()).offset(max_scans)
+    ))
+    if not expired:
+        db.session.commit()
+        return 0
+
+    # Child rows are removed explicitly; SQLite does not enforce ON DELETE by default
+    for model in (SearchEntry, SearchTrigram, SearchTerm, ScanFile):
+        db.session.execute(delete(model).where(model.scan_id.in_(expired)))
+    db.session.execute(delete(Scan).where(Scan.id.in_(expired)))
+    db.session.commit()
+    return len(expired)
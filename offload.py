@@ -0,0 +1,100 @@
+import math
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+from parser import analyze_file
+import metrics
+
+# Weight of the latest request in the moving average of analysis time
+SERVICE_TIME_WEIGHT = 0.1
+
+class Overloaded(Exception):
+    """Every worker is busy and the queue in front of them is full"""
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+def _analyze_remote(filename: str, content: str, file_type: str,
+                    timed: bool) -> Tuple[Dict[str, Any], Optional[metrics.PhaseTimer], float]:
+    """Pool entry point; the timer goes back to the serving process, which records it"""
+    started = time.perf_counter()
+    timer = metrics.PhaseTimer() if timed else metrics.NULL_TIMER
+    result = analyze_file(filename, content, file_type, timer)
+    return result, timer if timed else None, time.perf_counter() - started
+
+class AnalysisPool:
+    """A process pool for request handlers, with a bounded queue in front of it
+
+    Request threads block on their own analysis only, so a threaded server
+    keeps accepting while the CPU-bound parsing runs in ``workers``
+    processes.  At most ``workers + max_pending`` analyses are admitted at
+    once; analyze raises Overloaded beyond that, instead of letting requests
+    pile up behind the pool, with a retry delay estimated from recent
+    analysis times.  The processes start on first use.
+    """
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._service_seconds = 0.01
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def retry_after(self) -> int:
+        """Seconds for a full queue to drain at the recent per-file analysis time"""
+        return max(1, math.ceil((self.workers + self.max_pending) * self._service_seconds / self.workers))
+
+    def analyze(self, filename: str, content: str, file_type: str, timed: bool = False):
+        """analyze_file in a worker; returns (result, timer) and raises Overloaded when full"""
+        from concurrent.futures.process import BrokenProcessPool
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded(self.retry_after())
+        with self._lock:
+            self.in_flight += 1
+        try:
+            executor = self._get_executor()
+            try:
+                result, timer, seconds = executor.submit(_analyze_remote, filename, content, file_type,
+                                                         timed).result()
+            except BrokenProcessPool:
+                # A worker died (killed, out of memory); the next request gets a fresh pool
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                executor.shutdown(wait=False)
+                result = {'filename': filename, 'error': "Analysis worker stopped unexpectedly", 'tables': {}}
+                return result, metrics.NULL_TIMER
+            with self._lock:
+                self.completed += 1
+                self._service_seconds += SERVICE_TIME_WEIGHT * (seconds - self._service_seconds)
+            return result, timer if timer is not None else metrics.NULL_TIMER
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'workers': self.workers, 'max_pending': self.max_pending, 'in_flight': self.in_flight,
+                    'completed': self.completed, 'rejected': self.rejected}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
@@ -1,14 +1,23 @@
 import ast
 import re
 import os
+import sys
 import logging
-from typing import Dict, List, Any, Optional, Tuple, Set
+from typing import Dict, List, Any, Optional, Tuple, Set, Union
+
+from metrics import NULL_TIMER
+
+def _shared(value: Optional[str]) -> Optional[str]:
+    """Intern names that repeat across tables and files, such as column types"""
+    return sys.intern(value) if value is not None else None
 
 class TableField:
     """Represents a field in a PyTable table"""
+    __slots__ = ('name', 'field_type', 'description')
+    
     def __init__(self, name: str, field_type: Optional[str] = None, description: Optional[str] = None):
-        self.name = name
-        self.field_type = field_type
+        self.name = _shared(name)
+        self.field_type = _shared(field_type)
         self.description = description
     
     def to_dict(self) -> Dict[str, Any]:
@@ -20,9 +29,11 @@ class TableField:
 
 class Table:
     """Represents a PyTable table with its fields"""
+    __slots__ = ('name', 'variable_name', 'fields', 'is_temp')
+    
     def __init__(self, name: str, variable_name: Optional[str] = None):
-        self.name = name
-        self.variable_name = variable_name
+        self.name = _shared(name)
+        self.variable_name = _shared(variable_name)
         self.fields: List[TableField] = []
         self.is_temp = False
     
@@ -38,11 +49,16 @@ class Table:
         }
 
 class BaseParser:
-    """Base class for file parsers"""
-    def __init__(self, filename: str, content: str):
+    """Base class for file parsers
+
+    ``timer`` is a metrics.PhaseTimer that accumulates the time spent in each
+    parsing phase; by default nothing is measured.
+    """
+    def __init__(self, filename: str, content: str, timer=None):
         self.filename = filename
         self.content = content
         self.tables: Dict[str, Table] = {}
+        self.timer = timer or NULL_TIMER
     
     def parse(self) -> Dict[str, Any]:
         """Parse the file content to extract tables and fields"""
@@ -55,108 +71,198 @@ class BaseParser:
             'tables': {name: table.to_dict() for name, table in self.tables.items() if not table.is_temp}
         }
 
+class _PyTablesVisitor(ast.NodeVisitor):
+    """Collects everything PythonParser needs from a module in a single traversal.
+
+    Every recorded node is tagged with an ``(depth, preorder index)`` key.  Sorting
+    by that key reproduces the breadth-first order of ``ast.walk``, which is the
+    order the parser has always applied tables and fields in.
+    """
+    def __init__(self):
+        self.pytable_imports: Set[str] = set()
+        self.imports: Dict[str, str] = {}
+        self.class_defs: List[Tuple[Tuple[int, int], ast.ClassDef]] = []
+        self.table_calls: List[Tuple[Tuple[int, int], ast.Call, str]] = []
+        self.assigned_names: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._parents: List[Tuple[ast.AST, Tuple[int, int]]] = []
+        self._seq = 0
+    
+    def visit(self, node: ast.AST) -> Any:
+        self._seq += 1
+        return super().visit(node)
+    
+    def generic_visit(self, node: ast.AST) -> None:
+        self._parents.append((node, self._key()))
+        super().generic_visit(node)
+        self._parents.pop()
+    
+    def _key(self) -> Tuple[int, int]:
+        return (len(self._parents), self._seq)
+    
+    def visit_Import(self, node: ast.Import) -> None:
+        for name in node.names:
+            if 'tables' in name.name or 'pytables' in name.name:
+                self.pytable_imports.add(name.asname or name.name)
+            # ``import a.b`` binds ``a``; ``import a.b as c`` binds ``c`` to ``a.b``
+            if name.asname:
+                self.imports[name.asname] = name.name
+            else:
+                top = name.name.split('.')[0]
+                self.imports[top] = top
+        self.generic_visit(node)
+    
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module and ('tables' in node.module or 'pytables' in node.module):
+            for name in node.names:
+                self.pytable_imports.add(name.asname or name.name)
+        # Relative imports keep their leading dots, e.g. '..schemas.Sensor'
+        prefix = '.' * node.level + (node.module + '.' if node.module else '')
+        for name in node.names:
+            if name.name != '*':
+                self.imports[name.asname or name.name] = prefix + name.name
+        self.generic_visit(node)
+    
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.class_defs.append((self._key(), node))
+        self.generic_visit(node)
+    
+    def visit_Call(self, node: ast.Call) -> None:
+        if isinstance(node.func, ast.Attribute) and node.func.attr == 'createTable':
+            # Calls are matched to assignments structurally, so two identical
+            # createTable calls share the variable name of the first assignment
+            call_dump = ast.dump(node)
+            self.table_calls.append((self._key(), node, call_dump))
+            
+            parent, parent_key = self._parents[-1]
+            if (isinstance(parent, ast.Assign) and parent.value is node
+                    and isinstance(parent.targets[0], ast.Name)):
+                known = self.assigned_names.get(call_dump)
+                if known is None or parent_key < known[0]:
+                    self.assigned_names[call_dump] = (parent_key, parent.targets[0].id)
+        self.generic_visit(node)
+
+def _dotted_name(node: ast.AST) -> Optional[str]:
+    """'schemas.Sensor' for a name or attribute chain, None for any other expression"""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        value = _dotted_name(node.value)
+        return f'{value}.{node.attr}' if value else None
+    return None
+
+def may_define_tables(source: Union[str, bytes]) -> bool:
+    """Cheap screen run before parsing: can this source yield any table at all?
+
+    PythonParser only reports tables for modules importing a name containing
+    'tables' that also create a table or subclass Table or IsDescription, so
+    folder scans skip sources lacking those markers without building an AST.
+    Accepts text, bytes or a memory map of the file.
+    """
+    if isinstance(source, str):
+        return 'tables' in source and ('Table' in source or 'IsDescription' in source)
+    return source.find(b'tables') != -1 and (source.find(b'Table') != -1
+                                            or source.find(b'IsDescription') != -1)
+
 class PythonParser(BaseParser):
-    """Parser for Python files to extract PyTable information"""
+    """Parser for Python files to extract PyTable information
+
+    Tables created with a description class defined in the same module get
+    that class's fields.  With ``collect_symbols`` the result also carries a
+    'symbols' entry (imports, description classes and the description names
+    left unresolved) from which symbols.SymbolIndex resolves descriptions
+    imported from other modules of a scanned project.  Modules that do not
+    use PyTables get it too, as a package's __init__.py may re-export
+    descriptions.
+    """
+    def __init__(self, filename: str, content: str, timer=None, collect_symbols: bool = False):
+        super().__init__(filename, content, timer)
+        self.collect_symbols = collect_symbols
+        self.imports: Dict[str, str] = {}
+        self.descriptions: Dict[str, Tuple[List[str], List[TableField]]] = {}
+        self.table_descriptions: Dict[str, str] = {}
     
     def parse(self) -> Dict[str, Any]:
+        error = self._parse_tables()
+        if error:
+            return {
+                'filename': self.filename,
+                'error': error,
+                'tables': {}
+            }
+        return self.get_results()
+    
+    def _parse_tables(self) -> Optional[str]:
+        """Fill self.tables from the content, returning an error message on failure"""
         try:
             # Parse the Python code into an AST
-            tree = ast.parse(self.content)
-            
-            # Find PyTable imports
-            pytable_imports = self._find_pytable_imports(tree)
+            with self.timer.phase('ast_parse'):
+                tree = ast.parse(self.content)
             
-            if not pytable_imports:
-                return self.get_results()
+            # Collect imports, classes, assignments and calls in one pass
+            with self.timer.phase('walk'):
+                visitor = _PyTablesVisitor()
+                visitor.visit(tree)
             
-            # Extract table definitions and usages
-            self._extract_tables(tree, pytable_imports)
+            if not visitor.pytable_imports:
+                # Other modules may still import descriptions through this one
+                if self.collect_symbols:
+                    with self.timer.phase('extract'):
+                        self._extract_descriptions(visitor)
+                return None
             
-            # Extract fields from each table
-            self._extract_fields(tree)
+            with self.timer.phase('extract'):
+                # Extract table definitions and usages
+                self._extract_tables(visitor)
+                
+                # Extract fields from each table
+                self._extract_fields(visitor)
+                
+                # Give tables the fields of the description they were created with
+                self._extract_descriptions(visitor)
+                self._resolve_descriptions()
             
-            return self.get_results()
+            return None
         
         except SyntaxError as e:
             logging.error(f"Syntax error in {self.filename}: {str(e)}")
-            return {
-                'filename': self.filename,
-                'error': f"Syntax error: {str(e)}",
-                'tables': {}
-            }
+            return f"Syntax error: {str(e)}"
         except Exception as e:
             logging.error(f"Error parsing {self.filename}: {str(e)}")
-            return {
-                'filename': self.filename,
-                'error': f"Error: {str(e)}",
-                'tables': {}
-            }
+            return f"Error: {str(e)}"
     
-    def _find_pytable_imports(self, tree: ast.AST) -> Set[str]:
-        """Find all PyTable-related imports in the code"""
-        pytable_modules = set()
+    def _extract_tables(self, visitor: _PyTablesVisitor) -> None:
+        """Extract table definitions from the collected class definitions and calls"""
+        events = [(key, node, None) for key, node in visitor.class_defs]
+        events.extend(visitor.table_calls)
+        events.sort(key=lambda event: event[0])
         
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
-                for name in node.names:
-                    if 'tables' in name.name or 'pytables' in name.name:
-                        asname = name.asname or name.name
-                        pytable_modules.add(asname)
-            
-            elif isinstance(node, ast.ImportFrom):
-                if 'tables' in node.module or 'pytables' in node.module:
-                    for name in node.names:
-                        asname = name.asname or name.name
-                        pytable_modules.add(asname)
-                        
-        return pytable_modules
-    
-    def _extract_tables(self, tree: ast.AST, pytable_imports: Set[str]) -> None:
-        """Extract table definitions from the AST"""
-        for node in ast.walk(tree):
+        for _, node, call_dump in events:
             # Look for class definitions inheriting from Table or similar
             if isinstance(node, ast.ClassDef):
                 for base in node.bases:
                     if isinstance(base, ast.Name) and base.id in ('Table', 'IsDescription'):
                         table = Table(node.name)
                         self.tables[node.name] = table
-                        
-            # Look for table creation using createTable
-            elif isinstance(node, ast.Call):
-                if self._is_create_table_call(node, pytable_imports):
-                    table_name = self._extract_table_name_from_call(node)
-                    if table_name:
-                        # Check if this is a temporary table
-                        is_temp = self._is_temp_table(node)
-                        
-                        # Find variable name if assignment exists
-                        var_name = self._find_variable_name(node)
-                        
-                        table = Table(table_name, var_name)
-                        table.is_temp = is_temp
-                        self.tables[table_name] = table
             
-            # Look for openTable calls
-            elif isinstance(node, ast.Call):
-                if self._is_open_table_call(node, pytable_imports):
-                    table_name = self._extract_table_name_from_open(node)
-                    if table_name:
-                        var_name = self._find_variable_name(node)
-                        if table_name not in self.tables:
-                            table = Table(table_name, var_name)
-                            self.tables[table_name] = table
-    
-    def _is_create_table_call(self, node: ast.Call, pytable_imports: Set[str]) -> bool:
-        """Check if a node is a createTable call"""
-        if isinstance(node.func, ast.Attribute) and node.func.attr == 'createTable':
-            return True
-        return False
-    
-    def _is_open_table_call(self, node: ast.Call, pytable_imports: Set[str]) -> bool:
-        """Check if a node is an openTable call"""
-        if isinstance(node.func, ast.Attribute) and node.func.attr == 'openTable':
-            return True
-        return False
+            # Look for table creation using createTable
+            else:
+                table_name = self._extract_table_name_from_call(node)
+                if table_name:
+                    # Check if this is a temporary table
+                    is_temp = self._is_temp_table(node)
+                    
+                    # Find variable name if assignment exists
+                    var_name = self._find_variable_name(call_dump, visitor)
+                    
+                    table = Table(table_name, var_name)
+                    table.is_temp = is_temp
+                    self.tables[table_name] = table
+                    
+                    description = self._extract_description_from_call(node)
+                    if description:
+                        self.table_descriptions[table_name] = description
+                    else:
+                        self.table_descriptions.pop(table_name, None)
     
     def _extract_table_name_from_call(self, node: ast.Call) -> Optional[str]:
         """Extract table name from a createTable call"""
@@ -172,17 +278,15 @@ class PythonParser(BaseParser):
         
         return None
     
-    def _extract_table_name_from_open(self, node: ast.Call) -> Optional[str]:
-        """Extract table name from an openTable call"""
-        # Check for name parameter
+    def _extract_description_from_call(self, node: ast.Call) -> Optional[str]:
+        """Extract the description class name from a createTable call"""
         for kw in node.keywords:
-            if kw.arg == 'name':
-                if isinstance(kw.value, ast.Str):
-                    return kw.value.s
+            if kw.arg == 'description':
+                return _dotted_name(kw.value)
         
-        # Check positional arguments
-        if len(node.args) >= 1 and isinstance(node.args[0], ast.Str):
-            return node.args[0].s
+        # The description is the third positional argument
+        if len(node.args) >= 3:
+            return _dotted_name(node.args[2])
         
         return None
     
@@ -195,31 +299,26 @@ class PythonParser(BaseParser):
                 return kw.value.value is True
         return False
     
-    def _find_variable_name(self, node: ast.Call) -> Optional[str]:
+    def _find_variable_name(self, call_dump: str, visitor: _PyTablesVisitor) -> Optional[str]:
         """Find the variable name if the call is part of an assignment"""
-        for parent in ast.walk(ast.parse(self.content)):
-            if isinstance(parent, ast.Assign) and isinstance(parent.value, ast.Call):
-                if ast.dump(parent.value) == ast.dump(node) and len(parent.targets) > 0:
-                    if isinstance(parent.targets[0], ast.Name):
-                        return parent.targets[0].id
-        return None
+        assigned = visitor.assigned_names.get(call_dump)
+        return assigned[1] if assigned else None
     
-    def _extract_fields(self, tree: ast.AST) -> None:
+    def _extract_fields(self, visitor: _PyTablesVisitor) -> None:
         """Extract fields from each table definition"""
         # Find all classes that might define table fields
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                # Check if this class is a table description
-                parent_table = self._get_parent_table(node)
-                
-                if parent_table and parent_table in self.tables:
-                    # Extract fields from class body
-                    for field_node in node.body:
-                        if isinstance(field_node, ast.Assign):
-                            field_name, field_type = self._extract_field_info(field_node)
-                            if field_name:
-                                field = TableField(field_name, field_type)
-                                self.tables[parent_table].add_field(field)
+        for _, node in sorted(visitor.class_defs, key=lambda item: item[0]):
+            # Check if this class is a table description
+            parent_table = self._get_parent_table(node)
+            
+            if parent_table and parent_table in self.tables:
+                # Extract fields from class body
+                for field_node in node.body:
+                    if isinstance(field_node, ast.Assign):
+                        field_name, field_type = self._extract_field_info(field_node)
+                        if field_name:
+                            field = TableField(field_name, field_type)
+                            self.tables[parent_table].add_field(field)
     
     def _get_parent_table(self, class_node: ast.ClassDef) -> Optional[str]:
         """Determine if this class is a table description and return the table name"""
@@ -237,6 +336,73 @@ class PythonParser(BaseParser):
         
         return None
     
+    def _extract_descriptions(self, visitor: _PyTablesVisitor) -> None:
+        """Record the classes that may be table descriptions, with their bases and fields
+
+        A class qualifies when a base is IsDescription, another class of this
+        module or an imported name, which may be a description from elsewhere.
+        """
+        self.imports = visitor.imports
+        class_names = {node.name for _, node in visitor.class_defs}
+        for _, node in sorted(visitor.class_defs, key=lambda item: item[0]):
+            bases = [name for name in map(_dotted_name, node.bases) if name]
+            if not any(base.rsplit('.', 1)[-1] == 'IsDescription' or base in class_names
+                       or base.split('.', 1)[0] in self.imports for base in bases):
+                continue
+            
+            fields = []
+            for field_node in node.body:
+                if isinstance(field_node, ast.Assign):
+                    field_name, field_type = self._extract_field_info(field_node)
+                    if field_name:
+                        fields.append(TableField(field_name, field_type))
+            self.descriptions.setdefault(node.name, (bases, fields))
+    
+    def _description_fields(self, name: str, seen: Set[str]) -> Optional[List[TableField]]:
+        """Fields of a description of this module, inherited ones first
+
+        None when the description or one of its bases is not defined here.
+        """
+        if name not in self.descriptions or name in seen:
+            return None
+        bases, own = self.descriptions[name]
+        fields: Dict[str, TableField] = {}
+        for base in bases:
+            if base.rsplit('.', 1)[-1] == 'IsDescription':
+                continue
+            inherited = self._description_fields(base, seen | {name})
+            if inherited is None:
+                return None
+            fields.update((field.name, field) for field in inherited)
+        fields.update((field.name, field) for field in own)
+        return list(fields.values())
+    
+    def _resolve_descriptions(self) -> None:
+        """Fill tables without fields from the local description they were created with"""
+        for table_name, description in list(self.table_descriptions.items()):
+            table = self.tables[table_name]
+            if table.fields:
+                del self.table_descriptions[table_name]
+                continue
+            fields = self._description_fields(description, set())
+            if fields is not None:
+                table.fields = list(fields)
+                del self.table_descriptions[table_name]
+    
+    def get_results(self) -> Dict[str, Any]:
+        results = super().get_results()
+        if self.collect_symbols and (self.imports or self.descriptions or self.table_descriptions):
+            results['symbols'] = {
+                'imports': self.imports,
+                'descriptions': {
+                    name: {'bases': bases, 'fields': [[field.name, field.field_type] for field in fields]}
+                    for name, (bases, fields) in self.descriptions.items()
+                },
+                'tables': {name: description for name, description in self.table_descriptions.items()
+                           if not self.tables[name].is_temp}
+            }
+        return results
+    
     def _extract_field_info(self, assign_node: ast.Assign) -> Tuple[Optional[str], Optional[str]]:
         """Extract field name and type from an assignment node"""
         if len(assign_node.targets) == 1 and isinstance(assign_node.targets[0], ast.Name):
@@ -252,35 +418,232 @@ class PythonParser(BaseParser):
         
         return None, None
 
+# Interpreter names: python, python3, python3.11, pypy3 ...
+_PYTHON_NAME = re.compile(r'(?:python|pypy)(?:\d+(?:\.\d+)*)?')
+
+# Words that can come before the command itself
+_COMMAND_PREFIXES = {'env', 'nohup', 'exec', 'time', 'sudo', 'nice', 'command', 'builtin',
+                     'if', 'then', 'else', 'elif', 'do', 'while', 'until', '!', '{'}
+_ASSIGNMENT = re.compile(r'[A-Za-z_]\w*=')
+
+# Operators are matched before words; ((, $(( open arithmetic, where << is a shift
+_OPERATOR = re.compile(r'<<<|<<-|<<|&&|\|\||;;|\$\(\(|\(\(|[0-9]*>&|&>|[0-9]*>>|[0-9]*>|[<;&|()`]')
+_BLANKS = re.compile(r'(?:[ \t]|\\\n)+')
+_PLAIN_WORD = re.compile(r'[^\s\'"\;&|<>()`]+')
+_DOUBLE_QUOTED = re.compile(r'[^"\\]+')
+
+# Interpreter options whose value is the next argument
+_OPTIONS_WITH_VALUE = {'-W', '-X', '-Q', '--check-hash-based-pycs'}
+
+def _read_word(text: str, pos: int) -> Tuple[Optional[str], int]:
+    """Read one shell word at ``pos`` (after blanks), undoing quotes and escapes
+
+    Returns None instead of a word when an operator, a comment or the end of
+    the line comes first.  Quoted parts may span lines; an unterminated quote
+    runs to the end of the text.
+    """
+    n = len(text)
+    blanks = _BLANKS.match(text, pos)
+    if blanks:
+        pos = blanks.end()
+    if pos >= n or text[pos] in '\n#;&|<>()`':
+        return None, pos
+    
+    parts = []
+    while pos < n:
+        ch = text[pos]
+        if ch == "'":
+            close = text.find("'", pos + 1)
+            close = n if close == -1 else close
+            parts.append(text[pos + 1:close])
+            pos = close + 1
+        elif ch == '"':
+            pos += 1
+            while pos < n and text[pos] != '"':
+                chunk = _DOUBLE_QUOTED.match(text, pos)
+                if chunk:
+                    parts.append(chunk.group())
+                    pos = chunk.end()
+                    continue
+                # A backslash; inside double quotes it only escapes these characters
+                escaped = text[pos + 1:pos + 2]
+                if escaped in ('"', '\\', '$', '`'):
+                    parts.append(escaped)
+                elif escaped != '\n':
+                    parts.append('\\' + escaped)
+                pos += 2
+            pos += 1
+        elif ch == '\\':
+            if text[pos + 1:pos + 2] != '\n':
+                parts.append(text[pos + 1:pos + 2])
+            pos += 2
+        elif ch in ' \t\n;&|<>()`':
+            break
+        else:
+            plain = _PLAIN_WORD.match(text, pos)
+            parts.append(plain.group())
+            pos = plain.end()
+    return ''.join(parts), min(pos, n)
+
+def _python_arguments(words: List[str], blocks: List[str], files: List[str]) -> bool:
+    """Collect the ``-c`` code or script path of a command if it runs python
+
+    Returns whether the command is a python interpreter.
+    """
+    for index, word in enumerate(words):
+        name = os.path.basename(word)
+        if _ASSIGNMENT.match(word) or name in _COMMAND_PREFIXES or (index and word.startswith('-')):
+            continue
+        if not _PYTHON_NAME.fullmatch(name):
+            return False
+        break
+    else:
+        return False
+    
+    arguments = iter(words[index + 1:])
+    for word in arguments:
+        if word == '-c' or (word.startswith('-') and not word.startswith('--') and word.endswith('c')):
+            code = next(arguments, None)
+            if code:
+                blocks.append(code)
+            break
+        if word == '-m':
+            # Running a module, not a file
+            break
+        if word in _OPTIONS_WITH_VALUE:
+            next(arguments, None)
+        elif not word.startswith('-') or word == '-':
+            if word.endswith('.py'):
+                files.append(word)
+            break
+    return True
+
+def _read_heredoc(text: str, pos: int, delimiter: str, strip_tabs: bool) -> Tuple[str, int]:
+    """Read a heredoc body starting at ``pos``; returns it and the position after its delimiter line"""
+    n = len(text)
+    start = pos
+    while pos < n:
+        end = text.find('\n', pos)
+        end = n if end == -1 else end
+        line = text[pos:end].rstrip()
+        if (line.lstrip('\t') if strip_tabs else line) == delimiter:
+            body = text[start:pos]
+            pos = end + 1
+            break
+        pos = end + 1
+    else:
+        body = text[start:]
+    
+    if body.endswith('\n'):
+        body = body[:-1]
+    if strip_tabs:
+        body = '\n'.join(line.lstrip('\t') for line in body.split('\n'))
+    return body, pos
+
+def scan_shell_script(content: str) -> Tuple[List[str], List[str]]:
+    """Find the Python code a shell script runs, in a single forward pass
+
+    Returns the inline Python blocks and the .py files the script runs, as
+    written in the script.  Blocks are heredocs read by a pipeline that runs
+    python (or written to a .py file) and ``python -c`` arguments, with any
+    delimiter and shell quoting.  Lines that mention neither python nor a
+    heredoc are skipped without being tokenized.
+    """
+    blocks: List[str] = []
+    files: List[str] = []
+    n = len(content)
+    pos = 0
+    # The pipeline being read: its commands' words, and whether it writes a .py file
+    pipeline: Dict[str, Any] = {'commands': [[]], 'writes_python': False}
+    heredocs: List[Tuple[str, bool, Dict[str, Any]]] = []
+    
+    def end_pipeline() -> None:
+        nonlocal pipeline
+        pipeline['runs_python'] = any([_python_arguments(words, blocks, files) for words in pipeline['commands']])
+        pipeline = {'commands': [[]], 'writes_python': False}
+    
+    at_line_start = True
+    while pos < n:
+        if at_line_start:
+            at_line_start = False
+            line_end = content.find('\n', pos)
+            line_end = n if line_end == -1 else line_end
+            line = content[pos:line_end]
+            if 'py' not in line and '<<' not in line and not line.endswith('\\'):
+                pos = line_end + 1
+                at_line_start = True
+                continue
+        
+        ch = content[pos]
+        if ch in ' \t' or content.startswith('\\\n', pos):
+            pos = _BLANKS.match(content, pos).end()
+        elif ch == '\n':
+            pos += 1
+            end_pipeline()
+            for delimiter, strip_tabs, owner in heredocs:
+                body, pos = _read_heredoc(content, pos, delimiter, strip_tabs)
+                if owner['runs_python'] or owner['writes_python']:
+                    blocks.append(body)
+            heredocs = []
+            at_line_start = True
+        elif ch == '#':
+            end = content.find('\n', pos)
+            pos = n if end == -1 else end
+        elif ch in '<>;&|()`' or content.startswith('$((', pos) or ch.isdigit() and _OPERATOR.match(content, pos):
+            operator = _OPERATOR.match(content, pos)
+            if operator is None:
+                word, pos = _read_word(content, pos)
+                pipeline['commands'][-1].append(word)
+                continue
+            token = operator.group()
+            pos = operator.end()
+            if token in ('((', '$(('):
+                close = content.find('))', pos)
+                pos = n if close == -1 else close + 2
+            elif token in ('<<', '<<-'):
+                delimiter, pos = _read_word(content, pos)
+                if delimiter:
+                    heredocs.append((delimiter, token == '<<-', pipeline))
+            elif token == '<<<' or token == '<':
+                _, pos = _read_word(content, pos)
+            elif token.endswith('>') or token == '&>':
+                target, pos = _read_word(content, pos)
+                if target and target.endswith('.py'):
+                    pipeline['writes_python'] = True
+            elif token == '|':
+                pipeline['commands'].append([])
+            else:
+                end_pipeline()
+        else:
+            word, pos = _read_word(content, pos)
+            pipeline['commands'][-1].append(word)
+    
+    end_pipeline()
+    return blocks, files
+
 class ShellParser(BaseParser):
     """Parser for Shell scripts to extract PyTable information"""
     
+    def __init__(self, filename: str, content: str, timer=None):
+        super().__init__(filename, content, timer)
+        self.python_files: List[str] = []
+    
     def parse(self) -> Dict[str, Any]:
         """Parse shell scripts for PyTable usage"""
         try:
             # Look for Python code blocks or Python invocations
-            python_blocks = self._extract_python_blocks()
+            with self.timer.phase('shell_blocks'):
+                python_blocks = self._extract_python_blocks()
             
             # Parse each Python block
             for block in python_blocks:
-                parser = PythonParser(f"{self.filename}_block", block)
-                result = parser.parse()
+                parser = PythonParser(f"{self.filename}_block", block, self.timer)
+                if parser._parse_tables():
+                    continue
                 
-                # Merge the tables
-                for table_name, table_data in result.get('tables', {}).items():
-                    if table_name not in self.tables:
-                        table = Table(table_name, table_data.get('variable_name'))
-                        table.is_temp = table_data.get('is_temporary', False)
-                        
-                        # Add fields
-                        for field_data in table_data.get('fields', []):
-                            field = TableField(
-                                field_data.get('name', ''),
-                                field_data.get('type'),
-                                field_data.get('description')
-                            )
-                            table.add_field(field)
-                        
+                # Take over the block's tables; the first block defining a name wins
+                for table_name, table in parser.tables.items():
+                    if not table.is_temp and table_name not in self.tables:
                         self.tables[table_name] = table
             
             return self.get_results()
@@ -293,36 +656,25 @@ class ShellParser(BaseParser):
                 'tables': {}
             }
     
+    def get_results(self) -> Dict[str, Any]:
+        """Return the parsed results, with the Python files the script runs"""
+        results = super().get_results()
+        if self.python_files:
+            results['python_files'] = self.python_files
+        return results
+    
     def _extract_python_blocks(self) -> List[str]:
-        """Extract Python code blocks from shell script"""
-        python_blocks = []
-        
-        # Pattern for Python code in heredocs or similar
-        python_pattern = r'(?:python\s+-c\s+["\'](.+?)["\'])|(?:<<\s*(?:EOF|PYTHON)\s*\n([\s\S]+?)\nEOF)'
-        
-        matches = re.finditer(python_pattern, self.content)
-        for match in matches:
-            if match.group(1):  # python -c '...'
-                python_blocks.append(match.group(1))
-            elif match.group(2):  # heredoc
-                python_blocks.append(match.group(2))
-        
-        # Also look for Python files being executed
-        python_file_pattern = r'python\s+([^\s>|&;]+\.py)'
-        file_matches = re.finditer(python_file_pattern, self.content)
-        
-        # Just record the references, we can't parse the content without the file
-        for match in file_matches:
-            logging.info(f"Found reference to Python file: {match.group(1)}")
-        
+        """Extract Python code blocks from shell script, recording the Python files it runs"""
+        python_blocks, self.python_files = scan_shell_script(self.content)
         return python_blocks
 
-def analyze_file(filename: str, content: str, file_type: str) -> Dict[str, Any]:
+def analyze_file(filename: str, content: str, file_type: str, timer=None,
+                 collect_symbols: bool = False) -> Dict[str, Any]:
     """Analyze a file to extract PyTable information"""
     if file_type in ('py', 'python'):
-        parser = PythonParser(filename, content)
+        parser = PythonParser(filename, content, timer, collect_symbols)
     elif file_type in ('sh', 'bash'):
-        parser = ShellParser(filename, content)
+        parser = ShellParser(filename, content, timer)
     else:
         return {
             'filename': filename,
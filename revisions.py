@@ -0,0 +1,177 @@
+import subprocess
+from typing import Dict, List, Any, Iterable, Optional, Sequence, Tuple
+
+from scanner import allowed_file, analyze_sources
+from walker import matches_any
+from cache import ParseCache, with_filename
+from symbols import resolve_descriptions
+import metrics
+
+# Blobs read and parsed together; bounds the memory a large revision takes
+BLOB_BATCH = 512
+
+class GitError(Exception):
+    """A git command failed, for example because the ref does not exist"""
+
+def _git(repo_path: str, *args: str, input: Optional[bytes] = None) -> bytes:
+    try:
+        completed = subprocess.run(['git', '-C', repo_path, *args], input=input,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise GitError(f"Cannot run git: {str(e)}")
+    if completed.returncode != 0:
+        raise GitError(completed.stderr.decode('utf-8', 'replace').strip() or f"git {args[0]} failed")
+    return completed.stdout
+
+def list_blobs(repo_path: str, ref: str, include: Optional[Sequence[str]] = None,
+               exclude: Optional[Sequence[str]] = None) -> List[Tuple[str, str]]:
+    """(path, blob SHA) of every supported file in the tree of ``ref``
+
+    Symlinks and submodules are skipped; ``include`` and ``exclude`` work as
+    in scan_directory.
+    """
+    output = _git(repo_path, 'ls-tree', '-r', '-z', '--full-tree', ref)
+    blobs = []
+    for entry in output.split(b'\0'):
+        if not entry:
+            continue
+        info, _, path = entry.partition(b'\t')
+        mode, kind, sha = info.split()
+        if kind != b'blob' or mode == b'120000':
+            continue
+        path = path.decode('utf-8', 'surrogateescape')
+        if not allowed_file(path):
+            continue
+        if include and not matches_any(path, include):
+            continue
+        if exclude and (matches_any(path, exclude)
+                        or any(matches_any(parent, exclude) for parent in _parents(path))):
+            continue
+        blobs.append((path, sha.decode('ascii')))
+    return blobs
+
+def _parents(path: str) -> Iterable[str]:
+    parts = path.split('/')[:-1]
+    return ('/'.join(parts[:i]) for i in range(1, len(parts) + 1))
+
+def read_blobs(repo_path: str, shas: Sequence[str]) -> Dict[str, bytes]:
+    """Contents of the given blobs, read in one ``git cat-file --batch`` call"""
+    output = _git(repo_path, 'cat-file', '--batch', input=''.join(sha + '\n' for sha in shas).encode('ascii'))
+    blobs = {}
+    pos = 0
+    while pos < len(output):
+        end = output.index(b'\n', pos)
+        header = output[pos:end].split()
+        pos = end + 1
+        if len(header) != 3:
+            # '<sha> missing'
+            continue
+        size = int(header[2])
+        blobs[header[0].decode('ascii')] = output[pos:pos + size]
+        pos += size + 1
+    return blobs
+
+def scan_revision(repo_path: str, ref: str, cache: Optional[ParseCache] = None, workers: Optional[int] = 1,
+                  include: Optional[Sequence[str]] = None, exclude: Optional[Sequence[str]] = None,
+                  stats: Optional[Dict[str, int]] = None) -> Dict[str, Dict[str, Any]]:
+    """Analyze the supported files of a git revision without checking it out
+
+    Blobs are read from the object database and results are cached by blob
+    SHA, so a file unchanged between revisions is parsed once, and content
+    that appears under several paths is parsed once too.  Without a
+    ``cache`` an in-memory one is used for the call.  Results are keyed by
+    path like scan_directory's and carry the 'blob' they were read from.
+    Raises GitError when the repository or ref cannot be read.
+    """
+    own_cache = cache is None
+    if own_cache:
+        cache = ParseCache(':memory:')
+    try:
+        blobs = list_blobs(repo_path, ref, include, exclude)
+        results: Dict[str, Dict[str, Any]] = {}
+        missing: Dict[Tuple[str, str], List[str]] = {}
+        for path, sha in blobs:
+            key = (sha, _file_type(path))
+            cached = cache.get(*key) if key not in missing else None
+            if cached is None:
+                missing.setdefault(key, []).append(path)
+                results[path] = None
+                continue
+            cache.hits += 1
+            results[path] = _revision_result(cached, path, sha)
+            metrics.record_file(results[path])
+
+        pending = list(missing)
+        for start in range(0, len(pending), BLOB_BATCH):
+            batch = pending[start:start + BLOB_BATCH]
+            contents = read_blobs(repo_path, [sha for sha, _ in batch])
+            sources = [(missing[key][0], contents.get(key[0], b'')) for key in batch]
+            for key, result in zip(batch, analyze_sources(sources, workers, collect_symbols=True)):
+                cache.misses += 1
+                cache.put(*key, result)
+                paths = missing[key]
+                results[paths[0]] = _revision_result(result, paths[0], key[0])
+                # Every path gets its own copy; descriptions resolve differently per module
+                for path in paths[1:]:
+                    results[path] = _revision_result(cache.get(*key), path, key[0])
+
+        described = resolve_descriptions(results.items())
+        cache.flush()
+    finally:
+        if own_cache:
+            cache.close()
+
+    if stats is not None:
+        stats['files_scanned'] = stats.get('files_scanned', 0) + len(blobs)
+        stats['blobs_parsed'] = stats.get('blobs_parsed', 0) + len(missing)
+        stats['descriptions_resolved'] = stats.get('descriptions_resolved', 0) + described
+    return results
+
+def _file_type(path: str) -> str:
+    return path.rsplit('.', 1)[-1]
+
+def _revision_result(result: Dict[str, Any], path: str, sha: str) -> Dict[str, Any]:
+    result = with_filename(result, path)
+    result['folder_path'] = path.rpartition('/')[0]
+    result['blob'] = sha
+    return result
+
+def _field_types(table: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    return {field['name']: field['type'] for field in table.get('fields', [])}
+
+def diff_revisions(old_results: Dict[str, Dict[str, Any]],
+                   new_results: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Tables and fields added, removed or changed between two scan_revision results
+
+    Tables are matched by file path and table name.  Files are compared even
+    when their blob did not change, since a description imported from
+    another module may have.
+    """
+    report: Dict[str, List[Dict[str, Any]]] = {'added_tables': [], 'removed_tables': [], 'changed_tables': []}
+    for path in sorted(set(old_results) | set(new_results)):
+        old = old_results.get(path, {})
+        new = new_results.get(path, {})
+        old_tables = old.get('tables', {})
+        new_tables = new.get('tables', {})
+        for name in sorted(set(old_tables) | set(new_tables)):
+            if name not in old_tables:
+                report['added_tables'].append({'path': path, 'table': name, 'fields': new_tables[name]['fields']})
+            elif name not in new_tables:
+                report['removed_tables'].append({'path': path, 'table': name, 'fields': old_tables[name]['fields']})
+            else:
+                old_fields = _field_types(old_tables[name])
+                new_fields = _field_types(new_tables[name])
+                change = {
+                    'path': path,
+                    'table': name,
+                    'added_fields': [{'name': field, 'type': new_fields[field]}
+                                     for field in new_fields if field not in old_fields],
+                    'removed_fields': [{'name': field, 'type': old_fields[field]}
+                                       for field in old_fields if field not in new_fields],
+                    'changed_fields': [{'name': field, 'old_type': old_fields[field], 'new_type': new_fields[field]}
+                                       for field in new_fields
+                                       if field in old_fields and old_fields[field] != new_fields[field]]
+                }
+                if change['added_fields'] or change['removed_fields'] or change['changed_fields']:
+                    report['changed_tables'].append(change)
+    return report
@@ -0,0 +1,583 @@
+import functools
+import io
+from collections import deque
+import mmap
+import os
+import logging
+import threading
+import time
+import tokenize
+from typing import BinaryIO, Dict, List, Any, Iterable, Iterator, Optional, Sequence, Tuple, Callable
+
+from parser import analyze_file, may_define_tables
+from cache import ParseCache, content_digest, with_filename
+from sinks import DictSink
+from symbols import SymbolIndex, needs_index
+from walker import walk_tree
+import metrics
+
+ALLOWED_EXTENSIONS = {'py', 'sh', 'bash'}
+
+# Below this many files a process pool costs more to start than it saves
+MIN_PARALLEL_FILES = 16
+
+# Files per pool task when no chunksize is given
+DEFAULT_CHUNKSIZE = 32
+
+# Chunks submitted to the pool per worker and not yet consumed; bounds the
+# buffering between the parse stage and the sinks
+PENDING_CHUNKS_PER_WORKER = 2
+
+# Python files at least this large are prefiltered through mmap instead of being read
+PREFILTER_MMAP_SIZE = 1 << 20
+
+# Read-only cache handle of a pool worker, opened by _init_worker
+_worker_cache: Optional[ParseCache] = None
+
+# Whether pool workers time their files, set by _init_worker
+_worker_timed = False
+
+# Whether pool workers parse files the prefilter rules out, set by _init_worker
+_worker_strict = False
+
+# Process pools of analyze_sources by worker count, started on first use and
+# kept for the life of the process: starting one costs as much as parsing a
+# typical upload
+_source_pools: Dict[int, Any] = {}
+_source_pools_lock = threading.Lock()
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def _file_type(file_path: str) -> str:
+    return os.path.basename(file_path).split('.')[-1]
+
+def decode_source(data: bytes) -> str:
+    """Decode file bytes as Python reads source files
+
+    The encoding comes from a BOM or a PEP 263 coding comment and is UTF-8
+    otherwise, whatever the platform default.  Newlines are translated as
+    open(path, 'r') would.
+    """
+    encoding, _ = tokenize.detect_encoding(io.BytesIO(data).readline)
+    return io.TextIOWrapper(io.BytesIO(data), encoding=encoding).read()
+
+def _screened(file_path: str) -> bool:
+    """Whether the prefilter may rule a file out
+
+    Only Python modules are screened: a shell script may run Python files
+    that do use PyTables, and a package's __init__.py may re-export the
+    descriptions of its modules without mentioning tables.
+    """
+    return _file_type(file_path) == 'py' and os.path.basename(file_path) != '__init__.py'
+
+def _read_relevant(f: BinaryIO, screened: bool) -> Optional[bytes]:
+    """Read an open file, or return None when it is ``screened`` and the prefilter rules it out
+
+    Large files are searched through a memory map so a rejected file is
+    never copied into memory.
+    """
+    if not screened:
+        return f.read()
+    if os.fstat(f.fileno()).st_size >= PREFILTER_MMAP_SIZE:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[:] if may_define_tables(mapped) else None
+    data = f.read()
+    return data if may_define_tables(data) else None
+
+def _analyze_task(task: Tuple[str, str], cache: Optional[ParseCache], timed: bool = False,
+                  strict: bool = False) -> Tuple[Dict[str, Any], bool, Optional[str], str, Optional[metrics.PhaseTimer]]:
+    """Read and analyze one file.
+
+    Returns the result, whether the file could be read, the content digest,
+    how the result was produced ('parsed', 'cached' or 'rejected' by the
+    prefilter) and, when ``timed``, the PhaseTimer of the file.  Rejected
+    files are not parsed, or parsed only to report their errors when
+    ``strict``, and never cached.  Every error is turned into a result here
+    instead of propagating and aborting the rest of the scan.
+    """
+    file_path, rel_path = task
+    digest = None
+    outcome = 'parsed'
+    timer = metrics.PhaseTimer() if timed else metrics.NULL_TIMER
+    try:
+        file_type = _file_type(file_path)
+        screened = _screened(file_path)
+        with timer.phase('read'):
+            with open(file_path, 'rb') as f:
+                if timed:
+                    timer.add_bytes(os.fstat(f.fileno()).st_size)
+                data = f.read() if strict else _read_relevant(f, screened)
+
+        cached = None
+        if data is None or (strict and screened and not may_define_tables(data)):
+            outcome = 'rejected'
+        elif cache is not None:
+            with timer.phase('cache'):
+                digest = content_digest(data)
+                cached = cache.get(digest, file_type)
+
+        if data is None:
+            result = {'filename': rel_path, 'tables': {}}
+        elif cached is not None:
+            result = with_filename(cached, rel_path)
+            outcome = 'cached'
+        else:
+            with timer.phase('decode'):
+                content = decode_source(data)
+            result = analyze_file(rel_path, content, file_type, timer, collect_symbols=True)
+        success = True
+    except Exception as e:
+        logging.error(f"Error processing file {file_path}: {str(e)}")
+        result = {
+            "filename": rel_path,
+            "error": f"Error reading file: {str(e)}",
+            "tables": {}
+        }
+        success = False
+
+    # Store the folder path for organization
+    result['folder_path'] = os.path.dirname(rel_path)
+    return result, success, digest, outcome, timer if timed else None
+
+def analyze_path(file_path: str, rel_path: Optional[str] = None, cache: Optional[ParseCache] = None,
+                 strict: bool = True) -> Tuple[Dict[str, Any], bool]:
+    """Read and analyze a single file on disk, returning its result and whether it could be read
+
+    The result is named ``rel_path``, the path as given by default.  Unlike
+    in a directory scan, a Python file the prefilter rules out is still
+    parsed so its syntax errors are reported, unless ``strict`` is false.
+    With a ``cache`` the result is looked up and stored by content.
+    """
+    result, success, digest, outcome, _ = _analyze_task((file_path, rel_path or file_path), cache, strict=strict)
+    if cache is not None and success and outcome != 'rejected':
+        if outcome == 'cached':
+            cache.hits += 1
+        else:
+            cache.misses += 1
+            cache.put(digest, _file_type(file_path), result)
+    result.pop('symbols', None)
+    return result, success
+
+def _analyze_source(item: Tuple[str, bytes], timed: bool = False,
+                    collect_symbols: bool = False) -> Tuple[Dict[str, Any], Optional[metrics.PhaseTimer]]:
+    """Decode and analyze one in-memory file, turning any error into a result"""
+    filename, data = item
+    timer = metrics.PhaseTimer() if timed else metrics.NULL_TIMER
+    timer.add_bytes(len(data))
+    try:
+        with timer.phase('decode'):
+            content = decode_source(data)
+        result = analyze_file(filename, content, _file_type(filename), timer, collect_symbols)
+    except Exception as e:
+        logging.error(f"Error processing file {filename}: {str(e)}")
+        result = {
+            "filename": filename,
+            "error": f"Error reading file: {str(e)}",
+            "tables": {}
+        }
+    return result, timer if timed else None
+
+def analyze_sources(sources: Sequence[Tuple[str, bytes]], workers: Optional[int] = 1,
+                    timings: bool = False, collect_symbols: bool = False) -> List[Dict[str, Any]]:
+    """Analyze in-memory (filename, bytes) files, such as uploads, in order
+
+    With ``workers`` greater than one (``None`` means one per CPU) and enough
+    files, they are parsed in a process pool that later calls reuse.  Metrics
+    and ``timings`` are handled as in scan_directory; ``collect_symbols`` is
+    passed to analyze_file for symbols.resolve_descriptions.
+    """
+    from concurrent.futures.process import BrokenProcessPool
+
+    analyze = functools.partial(_analyze_source, timed=timings or metrics.is_enabled(),
+                                collect_symbols=collect_symbols)
+    workers = workers or os.cpu_count() or 1
+    analyzed = None
+    if workers > 1 and len(sources) >= MIN_PARALLEL_FILES:
+        executor = _source_pool(workers)
+        try:
+            analyzed = list(executor.map(analyze, sources, chunksize=_default_chunksize(len(sources), workers)))
+        except BrokenProcessPool:
+            # A worker died; drop the pool so the next call starts a fresh one
+            logging.error("Analysis pool broke, analyzing in-process")
+            with _source_pools_lock:
+                if _source_pools.get(workers) is executor:
+                    del _source_pools[workers]
+            executor.shutdown(wait=False)
+    if analyzed is None:
+        analyzed = [analyze(item) for item in sources]
+
+    results = []
+    for result, timer in analyzed:
+        metrics.record_file(result, timer)
+        if timings:
+            result['timings'] = timer.as_ms()
+        results.append(result)
+    return results
+
+def _source_pool(workers: int):
+    """The long-lived process pool of analyze_sources with ``workers`` processes"""
+    with _source_pools_lock:
+        executor = _source_pools.get(workers)
+        if executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+
+            executor = _source_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+        return executor
+
+def _link_python_files(file_path: str, result: Dict[str, Any], directory_path: str, cache: Optional[ParseCache],
+                       scanned: Dict[str, Dict[str, Any]], linked: Dict[str, Optional[Tuple[str, Dict[str, Any]]]],
+                       index: Optional[SymbolIndex] = None) -> Optional[int]:
+    """Add the tables of the Python files a shell script runs to the script's result
+
+    References are resolved relative to the script.  Files the scan took
+    from the tree take their tables from ``scanned``, keyed by absolute
+    path, so this scan's results are reused instead of being parsed again.
+    Other files are only followed when they are inside ``directory_path``,
+    symlinks resolved, so a scan never reads outside the tree it was given;
+    those the scan did not parse (excluded, or rejected by the prefilter)
+    are analyzed once per scan however many scripts run them.  Tables the
+    script defines itself win.  Returns the number of references resolved,
+    or None without changing the result while no complete ``index`` is
+    given and a referenced file of the tree is not analyzed yet.
+    """
+    script_dir = os.path.dirname(os.path.abspath(file_path))
+    root = os.path.abspath(directory_path)
+    real_root = os.path.realpath(root)
+    referenced_tables = []
+    for reference in result.get('python_files', ()):
+        if '$' in reference or '`' in reference:
+            continue
+        path = os.path.normpath(os.path.join(script_dir, reference))
+        if path in scanned:
+            referenced_tables.append(scanned[path])
+            continue
+        if not os.path.realpath(path).startswith(real_root + os.sep):
+            continue
+        if index is None:
+            return None
+        if path not in linked:
+            linked[path] = None
+            if os.path.isfile(path):
+                rel_path = os.path.relpath(path, root)
+                linked[path] = (rel_path, _analyze_task((path, rel_path), cache)[0])
+        if linked[path] is None:
+            continue
+        rel_path, referenced = linked[path]
+        if needs_index(referenced):
+            index.resolve_result(rel_path, referenced)
+        referenced.pop('symbols', None)
+        referenced_tables.append(referenced.get('tables', {}))
+
+    for tables in referenced_tables:
+        for name, table in tables.items():
+            result['tables'].setdefault(name, table)
+    return len(referenced_tables)
+
+def _init_worker(cache_path: Optional[str], timed: bool = False, strict: bool = False) -> None:
+    global _worker_cache, _worker_timed, _worker_strict
+    if cache_path:
+        _worker_cache = ParseCache(cache_path, readonly=True)
+    _worker_timed = timed
+    _worker_strict = strict
+
+def _analyze_path(task: Tuple[str, str]):
+    """Pool entry point for _analyze_task"""
+    return _analyze_task(task, _worker_cache, _worker_timed, _worker_strict)
+
+def _analyze_chunk(tasks: List[Tuple[str, str]]):
+    """Pool entry point analyzing a chunk of files"""
+    return [_analyze_path(task) for task in tasks]
+
+def _default_chunksize(task_count: int, workers: int) -> int:
+    """Split the tasks into roughly four chunks per worker"""
+    return max(1, min(64, task_count // (workers * 4)))
+
+def walk_files(directory_path: str, include: Optional[Sequence[str]] = None,
+               exclude: Optional[Sequence[str]] = None, **options: Any) -> Iterator[Tuple[str, str]]:
+    """Yield (path, path relative to the directory) of each supported file, in os.walk order
+
+    ``include`` and ``exclude`` are glob patterns matched against each path
+    relative to the directory and against its basename.  Only files matching
+    an include pattern (when given) and no exclude pattern are yielded, and
+    excluded directories are not walked into.  The other options are those
+    of walker.walk_tree: .gitignore files and DEFAULT_EXCLUDES prune the walk
+    unless turned off.
+    """
+    return walk_tree(directory_path, ALLOWED_EXTENSIONS, include, exclude, **options)
+
+def _timed(items: Iterable, counts: Dict[str, float], name: str) -> Iterator:
+    """Pass ``items`` through, adding the seconds spent producing them to counts[name]"""
+    items = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(items)
+        except StopIteration:
+            counts[name] += time.perf_counter() - start
+            return
+        counts[name] += time.perf_counter() - start
+        yield item
+
+def _iter_analyzed(tasks: Iterable[Tuple[str, str]], cache: Optional[ParseCache], timed: bool,
+                   workers: int, chunksize: int, strict: bool = False) -> Iterator[Tuple]:
+    """Read and parse stage: yield (position, task, result, success, digest, outcome, timer, stat) per file
+
+    Files the cache knows by path, mtime and size come out at once with the
+    outcome 'unchanged'.  The others are analyzed in-process or, once at
+    least MIN_PARALLEL_FILES of them are seen and ``workers`` is above one,
+    in a process pool.  At most PENDING_CHUNKS_PER_WORKER chunks per worker
+    are in flight: the walk only advances as results are consumed.
+    """
+    executor = None
+    inflight: deque = deque()
+    chunk: List[Tuple[int, Tuple[str, str], Optional[os.stat_result]]] = []
+    held: List[Tuple[int, Tuple[str, str], Optional[os.stat_result]]] = []
+
+    def submit(items):
+        future = executor.submit(_analyze_chunk, [task for _, task, _ in items])
+        inflight.append((items, future))
+
+    def drain_one():
+        items, future = inflight.popleft()
+        for (position, task, st), analyzed in zip(items, future.result()):
+            yield (position, task) + tuple(analyzed) + (st,)
+
+    try:
+        for position, task in enumerate(tasks):
+            st = None
+            if cache is not None:
+                try:
+                    st = os.stat(task[0])
+                    cached = cache.lookup_path(task[0], st.st_mtime_ns, st.st_size, _file_type(task[0]))
+                except OSError:
+                    cached = None
+                if cached is not None:
+                    result = with_filename(cached, task[1])
+                    result['folder_path'] = os.path.dirname(task[1])
+                    yield position, task, result, True, None, 'unchanged', None, st
+                    continue
+
+            if workers <= 1:
+                yield (position, task) + _analyze_task(task, cache, timed, strict) + (st,)
+                continue
+            if executor is None:
+                held.append((position, task, st))
+                if len(held) < MIN_PARALLEL_FILES:
+                    continue
+                from concurrent.futures import ProcessPoolExecutor
+
+                executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                               initargs=(cache.path if cache is not None else None, timed, strict))
+                chunk, held = held, []
+            else:
+                chunk.append((position, task, st))
+            while len(chunk) >= chunksize:
+                submit(chunk[:chunksize])
+                chunk = chunk[chunksize:]
+            while len(inflight) >= workers * PENDING_CHUNKS_PER_WORKER:
+                yield from drain_one()
+
+        # Too few files to be worth a pool
+        for position, task, st in held:
+            yield (position, task) + _analyze_task(task, cache, timed, strict) + (st,)
+        if chunk:
+            submit(chunk)
+        while inflight:
+            yield from drain_one()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+def iter_scan(directory_path: str, workers: Optional[int] = 1, chunksize: Optional[int] = None,
+              cache: Optional[ParseCache] = None, progress: Optional[Callable[[int, int], None]] = None,
+              stats: Optional[Dict[str, int]] = None, timings: bool = False,
+              include: Optional[Sequence[str]] = None, exclude: Optional[Sequence[str]] = None,
+              gitignore: bool = True, default_excludes: bool = True, follow_symlinks: bool = False,
+              max_file_size: Optional[int] = None,
+              strict: bool = False) -> Iterator[Tuple[int, str, Dict[str, Any], bool]]:
+    """Stream (position, relative path, result, success) for each file of a directory tree
+
+    The walk, read and parse stages are generators, so a file is walked to
+    only when the consumer asks for more results and memory does not grow
+    with the tree.  ``position`` is the file's index in walk order; results
+    mostly come in that order.  Results with tables created from a
+    description imported from another module need the whole tree and are
+    held back until the walk ends, as are shell scripts running a file of
+    the tree not analyzed yet or running such files.  Besides them, the
+    tables of each PyTables module, for the scripts that run it, and the
+    names, bases and imports of its descriptions are kept for the whole scan.
+    Description fields are read again from the cache when a held-back result
+    needs them, or kept too when there is no cache.  Each file is parsed at
+    most once per scan.  The options
+    are those of scan_directory.  With ``progress`` the file list is
+    collected first so its total is known.
+    """
+    counts = {'files_scanned': 0, 'prefilter_rejected': 0, 'python_files_linked': 0, 'descriptions_resolved': 0}
+    seconds = {'walk_seconds': 0.0, 'analyze_seconds': 0.0}
+    tasks: Iterable[Tuple[str, str]] = _timed(
+        walk_files(directory_path, include, exclude, gitignore=gitignore, default_excludes=default_excludes,
+                   follow_symlinks=follow_symlinks, max_file_size=max_file_size, counts=counts),
+        seconds, 'walk_seconds')
+    total = 0
+    if progress:
+        tasks = list(tasks)
+        total = len(tasks)
+        progress(0, total)
+
+    timed = timings or metrics.is_enabled()
+    workers = workers or os.cpu_count() or 1
+    analyzed = _iter_analyzed(tasks, cache, timed, workers, chunksize or DEFAULT_CHUNKSIZE, strict)
+    walked_seconds = seconds['walk_seconds']
+
+    def load_symbols(rel_path: str) -> Optional[Dict[str, Any]]:
+        return _analyze_task((os.path.join(directory_path, rel_path), rel_path), cache)[0].get('symbols')
+
+    # Without a cache, reloading description fields would mean parsing their module again
+    index = SymbolIndex(load_symbols if cache is not None else None)
+    # Tables of the Python files analyzed so far, for the shell scripts that run them
+    scanned: Dict[str, Dict[str, Any]] = {}
+    linked: Dict[str, Optional[Tuple[str, Dict[str, Any]]]] = {}
+    deferred: List[Tuple[int, str, str, Dict[str, Any], bool]] = []
+    try:
+        for position, (file_path, rel_path), result, success, digest, outcome, timer, st in _timed(
+                analyzed, seconds, 'analyze_seconds'):
+            metrics.record_file(result, timer)
+            if timings:
+                result['timings'] = timer.as_ms() if timer is not None else {}
+            counts['files_scanned'] += 1
+            if progress:
+                progress(counts['files_scanned'], total)
+
+            if outcome == 'rejected':
+                counts['prefilter_rejected'] += 1
+            elif outcome == 'unchanged':
+                cache.hits += 1
+            elif cache is not None and success:
+                if outcome == 'cached':
+                    cache.hits += 1
+                    cache.touch(digest, _file_type(file_path))
+                else:
+                    cache.misses += 1
+                    cache.put(digest, _file_type(file_path), result)
+                if st is not None:
+                    cache.remember_path(file_path, st.st_mtime_ns, st.st_size, digest)
+
+            if 'symbols' in result:
+                index.add(rel_path, result['symbols'], keep_fields=cache is None)
+            if needs_index(result):
+                deferred.append((position, file_path, rel_path, result, success))
+                continue
+            result.pop('symbols', None)
+            if outcome != 'rejected' and _file_type(file_path) == 'py':
+                scanned[os.path.abspath(file_path)] = result['tables']
+            if result.get('python_files'):
+                # Shell scripts take over the tables of the Python files they run
+                count = _link_python_files(file_path, result, directory_path, cache, scanned, linked)
+                if count is None:
+                    deferred.append((position, file_path, rel_path, result, success))
+                    continue
+                counts['python_files_linked'] += count
+            yield position, rel_path, result, success
+
+        # The index is complete once the walk is done; resolve every held-back
+        # module before the scripts that run them are linked
+        for _, file_path, rel_path, result, _ in deferred:
+            if 'symbols' in result:
+                counts['descriptions_resolved'] += index.resolve_result(rel_path, result)
+                scanned[os.path.abspath(file_path)] = result['tables']
+        for position, file_path, rel_path, result, success in deferred:
+            if result.get('python_files'):
+                counts['python_files_linked'] += _link_python_files(file_path, result, directory_path, cache,
+                                                                    scanned, linked, index)
+            yield position, rel_path, result, success
+    finally:
+        analyzed.close()
+        if cache is not None:
+            cache.flush()
+        # Reading and parsing pull files from the walk; report the two apart
+        seconds['analyze_seconds'] -= seconds['walk_seconds'] - walked_seconds
+        metrics.observe_phase('walk', seconds['walk_seconds'])
+        if stats is not None:
+            for name, count in counts.items():
+                stats[name] = stats.get(name, 0) + count
+            for name, value in seconds.items():
+                stats[name] = round(stats.get(name, 0) + value, 6)
+
+def scan_to_sinks(directory_path: str, sinks: Sequence[Any], **options: Any) -> int:
+    """Run iter_scan into each sink's write(position, rel_path, result) and close them
+
+    Returns the number of files read successfully.
+    """
+    file_count = 0
+    try:
+        for position, rel_path, result, success in iter_scan(directory_path, **options):
+            for sink in sinks:
+                sink.write(position, rel_path, result)
+            if success:
+                file_count += 1
+    finally:
+        for sink in sinks:
+            sink.close()
+    return file_count
+
+def scan_directory(directory_path, workers: Optional[int] = 1, chunksize: Optional[int] = None,
+                   cache: Optional[ParseCache] = None, progress: Optional[Callable[[int, int], None]] = None,
+                   stats: Optional[Dict[str, int]] = None, timings: bool = False,
+                   include: Optional[Sequence[str]] = None, exclude: Optional[Sequence[str]] = None,
+                   gitignore: bool = True, default_excludes: bool = True, follow_symlinks: bool = False,
+                   max_file_size: Optional[int] = None, strict: bool = False):
+    """Recursively scan directory for Python and Shell files
+
+    This is iter_scan into a DictSink: the whole {path: result} dict in walk
+    order, for the web UI.  Use iter_scan or scan_to_sinks to stream instead.
+
+    With ``workers`` greater than one (``None`` means one per CPU) the files are
+    analyzed in a process pool, submitted in chunks of ``chunksize`` files.
+
+    When a ``cache`` is given, files whose path, mtime and size are unchanged
+    are answered without being read, and files whose content was parsed
+    before are not parsed again.  Hits and misses are counted on the cache.
+
+    ``progress`` is called as ``progress(files_processed, files_total)`` while
+    the scan runs.
+
+    Python files that cannot define a table, other than packages'
+    __init__.py, are rejected by a byte-level prefilter and get an empty
+    result without being parsed; with ``strict``
+    they are still parsed so their syntax errors are reported.  Shell scripts
+    also list the tables of the .py files they run.  When a ``stats`` dict is
+    given, 'files_scanned', 'prefilter_rejected' and 'python_files_linked'
+    counts are added to it.
+
+    Tables created with a description class imported from another module of
+    the scanned tree get that class's fields; the descriptions of all
+    modules are indexed once per scan ('descriptions_resolved' in ``stats``).
+
+    Files are timed per phase when metrics are enabled, and with ``timings``
+    each result also gets a 'timings' dict of milliseconds per phase.
+
+    ``include`` and ``exclude`` filter the files as in walk_files.  The walk
+    skips whatever the tree's .gitignore files ignore unless ``gitignore`` is
+    false, and VCS, cache, virtualenv, node_modules and build directories
+    unless ``default_excludes`` is false.  Symlinked directories are entered
+    with ``follow_symlinks``, once each.  Files above ``max_file_size`` bytes
+    are skipped.  ``stats`` gets 'dirs_pruned', 'files_too_large' and
+    'symlink_loops' counts, and 'walk_seconds' and 'analyze_seconds' (reading
+    and parsing) apart.
+    """
+    try:
+        # Check if directory exists
+        if not os.path.isdir(directory_path):
+            return {"error": f"Directory not found: {directory_path}"}, None
+
+        sink = DictSink()
+        file_count = scan_to_sinks(directory_path, [sink], workers=workers, chunksize=chunksize, cache=cache,
+                                   progress=progress, stats=stats, timings=timings,
+                                   include=include, exclude=exclude, gitignore=gitignore,
+                                   default_excludes=default_excludes, follow_symlinks=follow_symlinks,
+                                   max_file_size=max_file_size, strict=strict)
+        return sink.results, file_count
+    except Exception as e:
+        logging.error(f"Error scanning directory {directory_path}: {str(e)}")
+        return {"error": f"Error scanning directory: {str(e)}"}, 0
@@ -0,0 +1,183 @@
+import time
+from array import array
+from typing import Dict, List, Any, Optional, Set
+
+from sqlalchemy import select, func
+
+from models import db, SearchTerm, SearchTrigram, SearchEntry
+
+SEARCH_KINDS = ('file', 'table', 'variable', 'field', 'type')
+SEARCH_MODES = ('exact', 'prefix', 'substring')
+
+# Rows per INSERT statement while building an index
+INSERT_BATCH = 5000
+
+# Beyond this many trigram candidates, filtering the term list directly is cheaper
+MAX_TRIGRAM_CANDIDATES = 5000
+
+# Substring queries shorter than a trigram cannot use the trigram postings and
+# are answered as prefix queries from the term index instead
+MIN_SUBSTRING_LENGTH = 3
+
+# Hits past the requested page's start are counted this far at most; an
+# exact count of a broad query costs a pass over every hit
+MAX_COUNTED_HITS = 1000
+
+def trigrams(term: str) -> Set[str]:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+def _insert_batched(model, rows: List[Dict[str, Any]]) -> None:
+    # Core inserts go straight to executemany; the ORM bulk path is far slower here
+    statement = model.__table__.insert()
+    for start in range(0, len(rows), INSERT_BATCH):
+        db.session.execute(statement, rows[start:start + INSERT_BATCH])
+
+def index_scan(scan_id: str, results: Dict[str, Dict[str, Any]]) -> int:
+    """Index file paths, table, variable and field names and field types of a scan
+
+    Each distinct lowercased value is stored once as a term, and each
+    trigram once with the packed numbers of the terms containing it;
+    occurrences point at their term.  Returns the number of occurrences
+    indexed.
+    """
+    term_numbers: Dict[str, int] = {}
+    entries: List[Dict[str, Any]] = []
+
+    def add(kind: str, value: str, path: str, table_name: Optional[str] = None,
+            field_name: Optional[str] = None, field_type: Optional[str] = None) -> None:
+        term = value.lower()
+        term_no = term_numbers.get(term)
+        if term_no is None:
+            term_no = term_numbers[term] = len(term_numbers)
+        entries.append({
+            'scan_id': scan_id, 'term_no': term_no, 'kind': kind, 'path': path,
+            'table_name': table_name, 'field_name': field_name, 'field_type': field_type
+        })
+
+    for path, result in results.items():
+        add('file', path, path)
+        for table_name, table in result.get('tables', {}).items():
+            add('table', table_name, path, table_name)
+            if table.get('variable_name'):
+                # A variable hit keeps the variable's name in the field_name column
+                add('variable', table['variable_name'], path, table_name, table['variable_name'])
+            for field in table.get('fields', []):
+                if field.get('name'):
+                    add('field', field['name'], path, table_name, field['name'], field.get('type'))
+                if field.get('type'):
+                    add('type', field['type'], path, table_name, field.get('name'), field['type'])
+
+    _insert_batched(SearchTerm, [
+        {'scan_id': scan_id, 'term_no': term_no, 'term': term} for term, term_no in term_numbers.items()
+    ])
+    postings: Dict[str, array] = {}
+    for term, term_no in term_numbers.items():
+        for trigram in trigrams(term):
+            postings.setdefault(trigram, array('I')).append(term_no)
+    _insert_batched(SearchTrigram, [
+        {'scan_id': scan_id, 'trigram': trigram, 'postings': term_nos.tobytes()}
+        for trigram, term_nos in postings.items()
+    ])
+    _insert_batched(SearchEntry, entries)
+    db.session.commit()
+    return len(entries)
+
+def _trigram_candidates(scan_id: str, term: str) -> Optional[List[int]]:
+    """Numbers of the terms containing every trigram of ``term``
+
+    Returns None when the trigrams cannot narrow the search: the query is
+    shorter than three characters or too many terms qualify.
+    """
+    grams = trigrams(term)
+    if not grams:
+        return None
+
+    rows = db.session.execute(
+        select(SearchTrigram.postings)
+        .where(SearchTrigram.scan_id == scan_id, SearchTrigram.trigram.in_(grams))
+    ).scalars().all()
+    if len(rows) < len(grams):
+        return []
+
+    lists = sorted((array('I', row) for row in rows), key=len)
+    candidates = set(lists[0])
+    for term_nos in lists[1:]:
+        candidates.intersection_update(term_nos)
+        if not candidates:
+            break
+    if len(candidates) > MAX_TRIGRAM_CANDIDATES:
+        return None
+    return sorted(candidates)
+
+def search_scan(scan_id: str, query: str, mode: str = 'substring', kind: Optional[str] = None,
+                page: int = 1, per_page: int = 50) -> Dict[str, Any]:
+    """Find indexed occurrences whose value equals, starts with or contains ``query``
+
+    Substring queries shorter than MIN_SUBSTRING_LENGTH run in prefix mode;
+    the result's 'mode' is the one used.  'total' is exact when
+    'total_exact' is true and a lower bound otherwise.
+    """
+    started = time.perf_counter()
+    term = query.strip().lower()
+    if mode == 'substring' and len(term) < MIN_SUBSTRING_LENGTH:
+        mode = 'prefix'
+
+    if mode == 'exact':
+        condition = SearchTerm.term == term
+    elif mode == 'prefix':
+        # U+10FFFF sorts after every code point, astral ones included
+        condition = (SearchTerm.term >= term) & (SearchTerm.term < term + '\U0010ffff')
+    else:
+        condition = SearchTerm.term.contains(term, autoescape=True)
+        candidates = _trigram_candidates(scan_id, term)
+        if candidates is not None:
+            condition = SearchTerm.term_no.in_(candidates) & condition
+
+    matching_terms = select(SearchTerm.term_no).where(SearchTerm.scan_id == scan_id, condition)
+    where = [SearchEntry.scan_id == scan_id, SearchEntry.term_no.in_(matching_terms)]
+    if kind:
+        where.append(SearchEntry.kind == kind)
+
+    # The IDs from the page on, up to the counting limit, give the page and the
+    # total while the terms are matched once
+    offset = (page - 1) * per_page
+    ids = db.session.execute(
+        select(SearchEntry.id).where(*where).order_by(SearchEntry.id).offset(offset).limit(MAX_COUNTED_HITS + 1)
+    ).scalars().all()
+    has_more = len(ids) > per_page
+    total_exact = len(ids) <= MAX_COUNTED_HITS
+    total = offset + min(len(ids), MAX_COUNTED_HITS)
+    if offset and not ids:
+        # Past the last page, so there are at most ``offset`` hits to count
+        total = db.session.scalar(select(func.count()).select_from(SearchEntry).where(*where))
+
+    rows = []
+    if ids:
+        rows = db.session.execute(
+            select(SearchEntry.kind, SearchEntry.path, SearchEntry.table_name,
+                   SearchEntry.field_name, SearchEntry.field_type)
+            .where(SearchEntry.id.in_(ids[:per_page]))
+            .order_by(SearchEntry.id)
+        ).all()
+
+    hits = []
+    for hit_kind, path, table_name, field_name, field_type in rows:
+        if hit_kind == 'variable':
+            hits.append({'kind': hit_kind, 'path': path, 'table': table_name, 'variable': field_name,
+                         'field': None, 'type': None})
+        else:
+            hits.append({'kind': hit_kind, 'path': path, 'table': table_name, 'field': field_name,
+                         'type': field_type})
+
+    return {
+        'scan_id': scan_id,
+        'query': query,
+        'mode': mode,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'total_exact': total_exact,
+        'has_more': has_more,
+        'took_ms': round((time.perf_counter() - started) * 1000, 2),
+        'hits': hits
+    }
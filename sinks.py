@@ -0,0 +1,76 @@
+import json
+import sqlite3
+from typing import Dict, List, Any, TextIO, Tuple, Union
+
+# Rows per INSERT batch of SQLiteSink
+SQLITE_BATCH = 500
+
+class DictSink:
+    """Collects results into a {path: result} dict in walk order, as the web UI expects
+
+    This is the one sink whose memory grows with the tree.  Field dicts equal
+    across files are shared: column definitions repeat heavily across the
+    files of a project, and a scan holding millions of fields would otherwise
+    keep a dict per occurrence.
+    """
+    def __init__(self):
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._positions: List[Tuple[int, str]] = []
+        self._shared: Dict[Tuple, Dict[str, Any]] = {}
+
+    def write(self, position: int, rel_path: str, result: Dict[str, Any]) -> None:
+        for table in result.get('tables', {}).values():
+            table['fields'] = [
+                self._shared.setdefault((field.get('name'), field.get('type'), field.get('description')), field)
+                for field in table.get('fields', [])
+            ]
+        self.results[rel_path] = result
+        self._positions.append((position, rel_path))
+
+    def close(self) -> None:
+        # Results that waited for the whole tree arrive last; restore the walk order
+        if any(a[0] > b[0] for a, b in zip(self._positions, self._positions[1:])):
+            self.results = {rel_path: self.results[rel_path] for _, rel_path in sorted(self._positions)}
+        self._shared.clear()
+
+class NDJSONSink:
+    """Writes one {"path", "result"} line per file, as export.iter_ndjson does"""
+    def __init__(self, output: Union[str, TextIO]):
+        self._owned = isinstance(output, str)
+        self.stream = open(output, 'w') if self._owned else output
+
+    def write(self, position: int, rel_path: str, result: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps({'path': rel_path, 'result': result}) + '\n')
+
+    def close(self) -> None:
+        if self._owned:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+class SQLiteSink:
+    """Stores each result as JSON in a SQLite table (position, path, result)
+
+    Rows are inserted in batches and committed on close.
+    """
+    def __init__(self, path: str, table: str = 'results'):
+        self.conn = sqlite3.connect(path)
+        self.table = table
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS {table} '
+                          f'(position INTEGER NOT NULL, path TEXT PRIMARY KEY, result TEXT NOT NULL)')
+        self._rows: List[Tuple[int, str, str]] = []
+
+    def write(self, position: int, rel_path: str, result: Dict[str, Any]) -> None:
+        self._rows.append((position, rel_path, json.dumps(result)))
+        if len(self._rows) >= SQLITE_BATCH:
+            self._flush()
+
+    def _flush(self) -> None:
+        self.conn.executemany(f'INSERT OR REPLACE INTO {self.table} (position, path, result) VALUES (?, ?, ?)',
+                              self._rows)
+        self._rows = []
+
+    def close(self) -> None:
+        self._flush()
+        self.conn.commit()
+        self.conn.close()
@@ -76,6 +76,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Initialize search functionality
     initializeSearch();
     
+    // Load folder contents on the results page as folders are opened
+    initializeLazyResults();
+    
     // Initialize code editor if source input exists
     const sourceInput = document.getElementById('source-input');
     if (sourceInput) {
@@ -136,81 +139,227 @@ function showAlert(message, type = 'info') {
     }, 5000);
 }
 
-// Initialize search functionality on results page
-function initializeSearch() {
-    const searchInput = document.getElementById('search-input');
-    if (!searchInput) return;
+// Escape text for insertion into HTML
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text == null ? '' : String(text);
+    return div.innerHTML;
+}
+
+// Pluralize a count, e.g. "1 table" / "3 tables"
+function countLabel(count, noun) {
+    return count === 1 ? `1 ${noun}` : `${count} ${noun}s`;
+}
+
+// Render one analyzed file as a card
+function renderFileCard(path, result) {
+    let icon = 'bi-file-code';
+    if (path.endsWith('.py')) {
+        icon = 'bi-filetype-py';
+    } else if (path.endsWith('.sh') || path.endsWith('.bash')) {
+        icon = 'bi-terminal';
+    }
     
-    searchInput.addEventListener('input', function() {
-        const searchTerm = this.value.toLowerCase();
-        filterResults(searchTerm);
-    });
+    const tables = Object.entries(result.tables || {});
+    let body;
+    if (result.error !== undefined) {
+        body = `
+            <div class="alert alert-danger">
+                <i class="bi bi-exclamation-circle me-2"></i>
+                Error parsing file: ${escapeHtml(result.error)}
+            </div>`;
+    } else if (tables.length === 0) {
+        body = `
+            <div class="alert alert-warning">
+                <i class="bi bi-info-circle me-2"></i>
+                No PyTable tables detected in this file.
+            </div>`;
+    } else {
+        body = tables.map(([tableName, table]) => renderTable(tableName, table)).join('');
+    }
+    
+    const card = document.createElement('div');
+    card.className = 'card mb-4 file-item fade-in';
+    card.innerHTML = `
+        <div class="card-header">
+            <div class="d-flex justify-content-between align-items-center">
+                <h5 class="mb-0">
+                    <i class="bi ${icon} me-2"></i>
+                    ${escapeHtml(path)}
+                </h5>
+                <span class="badge bg-secondary">${countLabel(tables.length, 'table')}</span>
+            </div>
+        </div>
+        <div class="card-body">${body}</div>
+    `;
+    return card;
+}
+
+// Render a table and its fields
+function renderTable(tableName, table) {
+    const fields = table.fields || [];
+    let fieldsHtml;
+    if (fields.length > 0) {
+        fieldsHtml = `
+            <div class="table-responsive">
+                <table class="table table-sm table-hover">
+                    <thead>
+                        <tr>
+                            <th>Field Name</th>
+                            <th>Type</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        ${fields.map(field => `
+                        <tr class="field-item">
+                            <td class="field-name">${escapeHtml(field.name)}</td>
+                            <td class="field-type">${escapeHtml(field.type || 'unknown')}</td>
+                        </tr>`).join('')}
+                    </tbody>
+                </table>
+            </div>`;
+    } else {
+        fieldsHtml = `
+            <div class="alert alert-secondary py-2">
+                <small>No fields detected for this table</small>
+            </div>`;
+    }
+    
+    return `
+        <div class="table-item mb-4">
+            <div class="d-flex justify-content-between align-items-center mb-2">
+                <h5 class="table-name mb-0">${escapeHtml(tableName)}</h5>
+                <div>
+                    ${table.variable_name ? `<span class="badge bg-secondary me-2">var: ${escapeHtml(table.variable_name)}</span>` : ''}
+                    <span class="badge bg-info">${countLabel(fields.length, 'field')}</span>
+                </div>
+            </div>
+            ${table.is_temporary ? `
+            <div class="alert alert-warning py-1 px-2 mb-2">
+                <small><i class="bi bi-clock-history me-1"></i>Temporary table</small>
+            </div>` : ''}
+            ${fieldsHtml}
+        </div>`;
 }
 
-// Filter results based on search term
-function filterResults(searchTerm) {
-    const tables = document.querySelectorAll('.table-item');
+// Fetch folder pages from the scan API when folders are opened
+function initializeLazyResults() {
+    const container = document.getElementById('results-container');
+    if (!container) return;
     
-    tables.forEach(table => {
-        const tableName = table.querySelector('.table-name').textContent.toLowerCase();
-        const fields = Array.from(table.querySelectorAll('.field-item'));
+    const filesUrl = container.dataset.filesUrl;
+    
+    function loadPage(folderEl) {
+        if (folderEl.dataset.loading === 'true') return;
         
-        // Check if table name matches
-        const tableMatches = tableName.includes(searchTerm);
+        const page = parseInt(folderEl.dataset.page || '0', 10) + 1;
+        const loading = folderEl.querySelector('.folder-loading');
+        const loadMore = folderEl.querySelector('.folder-load-more');
+        const list = folderEl.querySelector('.folder-file-list');
         
-        // Check if any field matches
-        const fieldMatches = fields.some(field => {
-            const fieldName = field.querySelector('.field-name').textContent.toLowerCase();
-            const fieldType = field.querySelector('.field-type')?.textContent.toLowerCase() || '';
-            
-            return fieldName.includes(searchTerm) || fieldType.includes(searchTerm);
+        folderEl.dataset.loading = 'true';
+        loading.style.display = '';
+        loadMore.style.display = 'none';
+        
+        const params = new URLSearchParams({folder: folderEl.dataset.folder, page: page});
+        fetch(`${filesUrl}?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                data.files.forEach(file => list.appendChild(renderFileCard(file.path, file.result)));
+                folderEl.dataset.page = String(page);
+                loadMore.style.display = data.has_more ? '' : 'none';
+            })
+            .catch(() => {
+                showAlert('Could not load the files of this folder', 'danger');
+                loadMore.style.display = '';
+            })
+            .finally(() => {
+                folderEl.dataset.loading = 'false';
+                loading.style.display = 'none';
+            });
+    }
+    
+    container.querySelectorAll('.folder-files').forEach(folderEl => {
+        folderEl.addEventListener('show.bs.collapse', function() {
+            if (!this.dataset.page) loadPage(this);
         });
+        folderEl.querySelector('.folder-load-more').addEventListener('click', () => loadPage(folderEl));
         
-        // Show/hide table based on match
-        if (tableMatches || fieldMatches) {
-            table.style.display = '';
-            
-            // If searching, highlight matching fields and hide non-matching
-            if (searchTerm) {
-                fields.forEach(field => {
-                    const fieldName = field.querySelector('.field-name').textContent.toLowerCase();
-                    const fieldType = field.querySelector('.field-type')?.textContent.toLowerCase() || '';
-                    
-                    if (fieldName.includes(searchTerm) || fieldType.includes(searchTerm)) {
-                        field.style.display = '';
-                        field.classList.add('bg-light');
-                    } else {
-                        if (tableMatches) {
-                            field.style.display = '';
-                            field.classList.remove('bg-light');
-                        } else {
-                            field.style.display = 'none';
-                        }
-                    }
-                });
-            } else {
-                // Reset field visibility and highlighting
-                fields.forEach(field => {
-                    field.style.display = '';
-                    field.classList.remove('bg-light');
-                });
-            }
-        } else {
-            table.style.display = 'none';
+        if (folderEl.classList.contains('show')) {
+            loadPage(folderEl);
         }
     });
+}
+
+// Initialize search functionality on results page
+function initializeSearch() {
+    const searchInput = document.getElementById('search-input');
+    if (!searchInput) return;
+    
+    const modeSelect = document.getElementById('search-mode');
+    let debounceTimer = null;
     
-    // Check if any results are visible
-    const visibleTables = Array.from(tables).filter(table => table.style.display !== 'none');
+    function onChange() {
+        clearTimeout(debounceTimer);
+        debounceTimer = setTimeout(() => runSearch(searchInput.value.trim(), modeSelect.value, 1), 250);
+    }
+    
+    searchInput.addEventListener('input', onChange);
+    modeSelect.addEventListener('change', onChange);
+    document.getElementById('search-load-more').addEventListener('click', function() {
+        runSearch(searchInput.value.trim(), modeSelect.value, parseInt(this.dataset.nextPage, 10));
+    });
+}
+
+// Query the scan's search index and show the matches in place of the folders
+function runSearch(query, mode, page) {
+    const searchInput = document.getElementById('search-input');
+    const resultsContainer = document.getElementById('results-container');
+    const searchResults = document.getElementById('search-results');
+    const hits = document.getElementById('search-hits');
+    const loadMore = document.getElementById('search-load-more');
     const noResultsMessage = document.getElementById('no-results-message');
     
-    if (noResultsMessage) {
-        if (visibleTables.length === 0 && searchTerm) {
-            noResultsMessage.style.display = 'block';
-        } else {
-            noResultsMessage.style.display = 'none';
-        }
+    if (!query) {
+        searchResults.style.display = 'none';
+        noResultsMessage.style.display = 'none';
+        resultsContainer.style.display = '';
+        return;
     }
+    
+    const params = new URLSearchParams({q: query, mode: mode, page: page});
+    fetch(`${searchInput.dataset.searchUrl}&${params}`)
+        .then(response => response.json())
+        .then(data => {
+            // Ignore responses to queries the user has already typed past
+            if (searchInput.value.trim() !== query) return;
+            
+            if (page === 1) hits.innerHTML = '';
+            data.hits.forEach(hit => {
+                const match = {file: hit.path, table: hit.table, variable: hit.variable || hit.table,
+                               field: hit.field, type: hit.type}[hit.kind];
+                const row = document.createElement('tr');
+                row.className = 'field-item';
+                row.innerHTML = `
+                    <td><span class="badge bg-secondary me-2">${escapeHtml(hit.kind)}</span>${escapeHtml(match)}</td>
+                    <td class="table-name">${escapeHtml(hit.table || '')}</td>
+                    <td class="field-name">${escapeHtml(hit.field || '')}</td>
+                    <td class="field-type">${escapeHtml(hit.type || '')}</td>
+                    <td>${escapeHtml(hit.path)}</td>
+                `;
+                hits.appendChild(row);
+            });
+            
+            document.getElementById('search-summary').textContent =
+                `${data.total}${data.total_exact ? '' : '+'} matches (${data.took_ms} ms)`;
+            loadMore.dataset.nextPage = String(data.page + 1);
+            loadMore.style.display = data.has_more ? '' : 'none';
+            
+            resultsContainer.style.display = 'none';
+            searchResults.style.display = data.total > 0 ? '' : 'none';
+            noResultsMessage.style.display = data.total > 0 ? 'none' : 'block';
+        })
+        .catch(() => showAlert('Search failed', 'danger'));
 }
 
 // Try to detect the type of file based on content
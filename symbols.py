@@ -0,0 +1,177 @@
+import os
+from typing import Callable, Dict, List, Any, Optional, Set, Tuple, Iterable
+
+# Re-exports followed before a description name is given up on
+MAX_REEXPORTS = 8
+
+def module_name(rel_path: str) -> Tuple[str, bool]:
+    """Dotted module name of a file relative to the scanned folder, and whether it is a package"""
+    parts = rel_path.replace(os.sep, '/').split('/')
+    parts[-1] = parts[-1].rsplit('.', 1)[0]
+    is_package = parts[-1] == '__init__'
+    if is_package:
+        parts.pop()
+    return '.'.join(parts), is_package
+
+class SymbolIndex:
+    """Description classes of every module of a scan, keyed by dotted name
+
+    Built once per scan from the 'symbols' of the Python results, so a
+    description imported by many files is resolved without parsing its
+    module again.  The import root of a project is unknown, so each module is
+    also registered under every shorter suffix of its name ('schemas' for
+    'pkg/schemas.py') unless two modules share that suffix.
+
+    Modules added with ``keep_fields=False`` only keep their imports and the
+    names and bases of their descriptions; ``loader(rel_path)`` is called for
+    the full symbols of a module once one of its descriptions is needed.
+    """
+    def __init__(self, loader: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None):
+        self.loader = loader
+        self._modules: Dict[str, Tuple[str, bool, Dict[str, Any], str]] = {}
+        self._suffixes: Dict[str, Optional[Tuple[str, bool, Dict[str, Any], str]]] = {}
+        self._fields: Dict[Tuple[str, str], Optional[List[Dict[str, Any]]]] = {}
+        self._loaded: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def add(self, rel_path: str, symbols: Dict[str, Any], keep_fields: bool = True) -> None:
+        module, is_package = module_name(rel_path)
+        if not keep_fields:
+            symbols = {
+                'imports': symbols['imports'],
+                'descriptions': {name: {'bases': description['bases']}
+                                 for name, description in symbols['descriptions'].items()}
+            }
+        entry = (module, is_package, symbols, rel_path)
+        self._modules[module] = entry
+        parts = module.split('.')
+        for start in range(1, len(parts)):
+            suffix = '.'.join(parts[start:])
+            known = self._suffixes.get(suffix, entry)
+            self._suffixes[suffix] = entry if known is entry or (known and known[0] == module) else None
+
+    def _module(self, name: str) -> Optional[Tuple[str, bool, Dict[str, Any], str]]:
+        return self._modules.get(name) or self._suffixes.get(name)
+
+    def _full_description(self, module: str, name: str) -> Optional[Dict[str, Any]]:
+        """A description with its fields, loading its module's symbols if they were dropped"""
+        _, _, symbols, rel_path = self._modules[module]
+        description = symbols['descriptions'][name]
+        if 'fields' in description:
+            return description
+        if module not in self._loaded:
+            self._loaded[module] = self.loader(rel_path) if self.loader else None
+        loaded = self._loaded[module]
+        return loaded['descriptions'].get(name) if loaded else None
+
+    def _absolute(self, module: str, is_package: bool, reference: str) -> Optional[str]:
+        """Turn a name as written in ``module`` into a dotted name from the project root"""
+        head, _, rest = reference.partition('.')
+        if head:
+            imported = self._modules[module][2]['imports'].get(head)
+            if imported is None:
+                # Not imported, so defined in the module itself
+                return f'{module}.{reference}'
+            reference = imported + ('.' + rest if rest else '')
+            if not reference.startswith('.'):
+                return reference
+
+        # Relative import: one dot is the current package, each further dot its parent
+        name = reference.lstrip('.')
+        level = len(reference) - len(name)
+        package = module.split('.') if is_package else module.split('.')[:-1]
+        if level - 1 > len(package):
+            return None
+        package = package[:len(package) - (level - 1)]
+        return '.'.join(package + [name])
+
+    def _lookup(self, target: Optional[str]) -> Optional[Tuple[str, str]]:
+        """The (module, class name) a dotted name refers to, following re-exports"""
+        for _ in range(MAX_REEXPORTS):
+            if not target or '.' not in target:
+                return None
+            module_part, _, name = target.rpartition('.')
+            entry = self._module(module_part)
+            if entry is None:
+                return None
+            module, is_package, symbols, _ = entry
+            if name in symbols['descriptions']:
+                return module, name
+            if name not in symbols['imports']:
+                return None
+            target = self._absolute(module, is_package, name)
+        return None
+
+    def _description_fields(self, module: str, name: str, seen: Set[Tuple[str, str]]) -> Optional[List[Dict[str, Any]]]:
+        """Field dicts of a description, inherited ones first; memoized for the whole scan"""
+        key = (module, name)
+        if key in self._fields:
+            return self._fields[key]
+        if key in seen:
+            return None
+
+        is_package = self._modules[module][1]
+        description = self._full_description(module, name)
+        if description is None:
+            self._fields[key] = None
+            return None
+        fields: Dict[str, Dict[str, Any]] = {}
+        resolved: Optional[List[Dict[str, Any]]] = None
+        for base in description['bases']:
+            if base.rsplit('.', 1)[-1] == 'IsDescription':
+                continue
+            found = self._lookup(self._absolute(module, is_package, base))
+            inherited = self._description_fields(*found, seen | {key}) if found else None
+            if inherited is None:
+                break
+            fields.update((field['name'], field) for field in inherited)
+        else:
+            fields.update((field_name, {'name': field_name, 'type': field_type, 'description': None})
+                          for field_name, field_type in description['fields'])
+            resolved = list(fields.values())
+        self._fields[key] = resolved
+        return resolved
+
+    def resolve(self, rel_path: str, reference: str) -> Optional[List[Dict[str, Any]]]:
+        """Fields of the description ``reference`` names in the module at ``rel_path``"""
+        module, is_package = module_name(rel_path)
+        if module not in self._modules:
+            return None
+        found = self._lookup(self._absolute(module, is_package, reference))
+        return self._description_fields(*found, set()) if found else None
+
+    def resolve_result(self, rel_path: str, result: Dict[str, Any]) -> int:
+        """Fill the tables of a result from its unresolved descriptions and drop its 'symbols'
+
+        Returns the number of tables that got fields.
+        """
+        symbols = result.pop('symbols', None)
+        if not symbols:
+            return 0
+        resolved = 0
+        for table_name, reference in symbols['tables'].items():
+            table = result['tables'].get(table_name)
+            if table is None or table['fields']:
+                continue
+            fields = self.resolve(rel_path, reference)
+            if fields:
+                table['fields'] = fields
+                resolved += 1
+        return resolved
+
+def needs_index(result: Dict[str, Any]) -> bool:
+    """Whether a result names descriptions only the whole scan's index can resolve"""
+    symbols = result.get('symbols')
+    return bool(symbols and symbols['tables'])
+
+def resolve_descriptions(results: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+    """Give tables created with an imported description the fields of that description
+
+    ``results`` are (relative path, result) pairs of one scan.  Their
+    'symbols' entries are indexed in one pass, then removed from the
+    results.  Returns the number of tables that got fields.
+    """
+    with_symbols = [(rel_path, result) for rel_path, result in results if 'symbols' in result]
+    index = SymbolIndex()
+    for rel_path, result in with_symbols:
+        index.add(rel_path, result['symbols'])
+    return sum(index.resolve_result(rel_path, result) for rel_path, result in with_symbols)
@@ -0,0 +1,216 @@
+import fnmatch
+import os
+import re
+from typing import Dict, List, Iterator, Optional, Pattern, Sequence, Set, Tuple
+
+# Directories that never hold code worth analyzing: VCS metadata, caches,
+# virtualenvs, dependencies and build output
+DEFAULT_EXCLUDES = ('.git', '.hg', '.svn', '__pycache__', '.mypy_cache', '.pytest_cache', '.tox', '.nox',
+                    'venv', '.venv', 'node_modules', 'site-packages', 'build', 'dist', '*.egg-info')
+
+# A directory holding this file is a virtualenv, whatever its name
+VENV_MARKER = 'pyvenv.cfg'
+
+def matches_any(rel_path: str, patterns: Sequence[str]) -> bool:
+    """Whether a relative path or its basename matches one of the glob patterns"""
+    rel_path = rel_path.replace(os.sep, '/')
+    name = rel_path.rsplit('/', 1)[-1]
+    return any(fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a gitignore glob, where * and ? stop at slashes and ** crosses them"""
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '[':
+            close = pattern.find(']', i + 2)
+            if close == -1:
+                parts.append(re.escape('['))
+                i += 1
+                continue
+            body = pattern[i + 1:close]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            parts.append('[' + body.replace('\\', '\\\\') + ']')
+            i = close + 1
+        elif pattern[i] == '\\' and i + 1 < n:
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(parts)
+
+class IgnoreRules:
+    """The patterns of one .gitignore file, which apply below its directory
+
+    Supports comments, ! negation, trailing / for directories only, patterns
+    anchored by a slash, and * ? [] ** globs.
+    """
+    def __init__(self, base: str, lines: Sequence[str]):
+        self.base = base
+        self.rules: List[Tuple[Pattern[str], bool, bool]] = []
+        for line in lines:
+            line = line.rstrip('\n').rstrip('\r')
+            if not line.endswith('\\ '):
+                line = line.rstrip(' ')
+            if not line or line.startswith('#'):
+                continue
+            negate = line.startswith('!')
+            if negate:
+                line = line[1:]
+            elif line.startswith('\\'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            # Without an inner slash a pattern matches a name at any depth
+            if '/' in line:
+                line = line.lstrip('/')
+            else:
+                line = '**/' + line
+            self.rules.append((re.compile(_glob_to_regex(line) + r'\Z'), negate, dir_only))
+
+    @classmethod
+    def from_file(cls, base: str, path: str) -> Optional['IgnoreRules']:
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                rules = cls(base, f.readlines())
+        except OSError:
+            return None
+        return rules if rules.rules else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included by a negation, None if no pattern matches"""
+        if self.base:
+            rel_path = rel_path[len(self.base) + 1:]
+        for regex, negate, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                return not negate
+        return None
+
+def _ignored(rule_stack: Sequence[IgnoreRules], rel_path: str, is_dir: bool) -> bool:
+    # Deeper .gitignore files take precedence over the ones above them
+    for rules in reversed(rule_stack):
+        verdict = rules.match(rel_path, is_dir)
+        if verdict is not None:
+            return verdict
+    return False
+
+def walk_tree(directory_path: str, extensions: Set[str], include: Optional[Sequence[str]] = None,
+              exclude: Optional[Sequence[str]] = None, default_excludes: bool = True, gitignore: bool = True,
+              follow_symlinks: bool = False, max_file_size: Optional[int] = None,
+              counts: Optional[Dict[str, int]] = None) -> Iterator[Tuple[str, str]]:
+    """Yield (path, relative path) of each file with one of ``extensions``, in os.walk order
+
+    Excluded directories are pruned without being listed: those matching
+    ``exclude`` or, with ``default_excludes``, DEFAULT_EXCLUDES, those holding
+    a virtualenv, and with ``gitignore`` those ignored by a .gitignore (or
+    .git/info/exclude) of the tree.  ``include`` and ``exclude`` are glob
+    patterns matched against the relative path and the basename.
+
+    Symlinked directories are only entered with ``follow_symlinks``, and a
+    directory already visited is never entered again, so link cycles end.
+    Files larger than ``max_file_size`` bytes are skipped.  ``counts`` gets
+    'dirs_pruned', 'files_too_large' and 'symlink_loops' added to it.
+    """
+    counts = counts if counts is not None else {}
+    for name in ('dirs_pruned', 'files_too_large', 'symlink_loops'):
+        counts.setdefault(name, 0)
+    dir_excludes = list(exclude or ()) + (list(DEFAULT_EXCLUDES) if default_excludes else [])
+
+    root_rules: List[IgnoreRules] = []
+    if gitignore:
+        info_exclude = IgnoreRules.from_file('', os.path.join(directory_path, '.git', 'info', 'exclude'))
+        if info_exclude:
+            root_rules.append(info_exclude)
+
+    visited: Set[Tuple[int, int]] = set()
+    try:
+        st = os.stat(directory_path)
+        visited.add((st.st_dev, st.st_ino))
+    except OSError:
+        return
+
+    # Depth first, each directory's files before its subdirectories, like os.walk
+    stack: List[Tuple[str, str, List[IgnoreRules]]] = [(directory_path, '', root_rules)]
+    while stack:
+        path, rel_dir, rule_stack = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        names = {entry.name for entry in entries}
+        if rel_dir and default_excludes and VENV_MARKER in names:
+            counts['dirs_pruned'] += 1
+            continue
+        if gitignore and '.gitignore' in names:
+            rules = IgnoreRules.from_file(rel_dir, os.path.join(path, '.gitignore'))
+            if rules:
+                rule_stack = rule_stack + [rules]
+
+        subdirs = []
+        for entry in entries:
+            rel_path = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                if ((dir_excludes and matches_any(rel_path, dir_excludes))
+                        or (rule_stack and _ignored(rule_stack, rel_path, True))):
+                    counts['dirs_pruned'] += 1
+                    continue
+                if entry.is_symlink():
+                    if not follow_symlinks:
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    key = (st.st_dev, st.st_ino)
+                else:
+                    key = (entry.stat(follow_symlinks=False).st_dev, entry.inode())
+                if key in visited:
+                    counts['symlink_loops'] += 1
+                    continue
+                visited.add(key)
+                subdirs.append((entry.path, rel_path))
+                continue
+
+            if '.' not in entry.name or entry.name.rsplit('.', 1)[1].lower() not in extensions:
+                continue
+            if include and not matches_any(rel_path, include):
+                continue
+            if exclude and matches_any(rel_path, exclude):
+                continue
+            if rule_stack and _ignored(rule_stack, rel_path, False):
+                continue
+            if max_file_size is not None:
+                try:
+                    if entry.stat().st_size > max_file_size:
+                        counts['files_too_large'] += 1
+                        continue
+                except OSError:
+                    pass
+            yield entry.path, rel_path.replace('/', os.sep)
+
+        for subdir in reversed(subdirs):
+            stack.append(subdir + (rule_stack,))